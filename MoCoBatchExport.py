@@ -0,0 +1,171 @@
+# Batch export of Raw Move and Arc Move files from the command line, without opening the Blender UI.
+# Each job runs MoCoExportAddon.py inside a background Blender process, with up to --jobs of them running at once.
+#
+# python MoCoBatchExport.py takes/*.blend --type raw arc --jobs 4
+# python MoCoBatchExport.py shot010.blend --scene Main --scene Alt --frames 1 240 --blender /opt/blender/blender
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+addonPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'MoCoExportAddon.py')
+batchResultPrefix = 'MOCO_BATCH_RESULT '
+
+
+# Export path without extension of every scene of a .blend file, and the name of its active scene, as
+# ({scene: path}, activeScene). Read by running the addon with --list-outputs. Returns None if Blender fails.
+def getOutputPaths(blender, blendFile, timeout):
+    command = [blender, '--background', '--factory-startup', blendFile, '--python-exit-code', '1', '--python', addonPath, '--', '--list-outputs']
+    try:
+        process = subprocess.run(command, stdout = subprocess.PIPE, stderr = subprocess.STDOUT, text = True, timeout = timeout)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+    for line in process.stdout.splitlines():
+        if line.startswith(batchResultPrefix):
+            result = json.loads(line[len(batchResultPrefix):])
+            return result['outputs'], result['scene']
+    return None
+
+
+# Suffix added to the export filename of each job that would write the same files as another job, so they can't
+# overwrite each other's files. Jobs from different .blend files get the .blend file name, and jobs from the same
+# .blend file get the scene name. jobs are (blendFile, scene) pairs with absolute paths, and outputs maps each
+# .blend file to the result of getOutputPaths. Jobs of files whose outputs are unknown get no suffix.
+def getJobSuffixes(jobs, outputs):
+    def cleanName(name):
+        return re.sub(r'[^\w.-]', '_', name)
+
+    sceneNames = []
+    paths = []
+    for blendFile, scene in jobs:
+        fileOutputs = outputs.get(blendFile)
+        sceneName = scene if fileOutputs is None or not (scene is None) else fileOutputs[1]
+        path = None if fileOutputs is None else fileOutputs[0].get(sceneName)
+        sceneNames.append(sceneName)
+        paths.append(None if path is None else os.path.normcase(os.path.normpath(path)))
+
+    suffixes = []
+    for index, (blendFile, scene) in enumerate(jobs):
+        sharing = [other for other in range(len(jobs)) if not (paths[index] is None) and paths[other] == paths[index]]
+        suffix = ""
+        if len(sharing) > 1:
+            if len(set(jobs[other][0] for other in sharing)) > 1:
+                suffix += "_" + cleanName(os.path.splitext(os.path.basename(blendFile))[0])
+            if len([other for other in sharing if jobs[other][0] == blendFile]) > 1:
+                suffix += "_" + cleanName(sceneNames[index])
+        suffixes.append(suffix)
+
+    # A suffixed name can still be taken, by another job's filename or by the active scene given again by name. Later
+    # suffixed jobs move out of the way of earlier ones.
+    for index in range(len(jobs)):
+        if suffixes[index] and not (paths[index] is None):
+            taken = [paths[other] + suffixes[other] for other in range(len(jobs)) if (other < index or not suffixes[other]) and not (paths[other] is None)]
+            number = 2
+            suffix = suffixes[index]
+            while paths[index] + suffix in taken:
+                suffix = suffixes[index] + "_" + str(number)
+                number += 1
+            suffixes[index] = suffix
+    return suffixes
+
+
+# Run one export job in its own Blender process and return its result summary
+def runJob(blender, blendFile, scene, frames, exportTypes, timeout, suffix = ""):
+    command = [blender, '--background', '--factory-startup', blendFile, '--python-exit-code', '1', '--python', addonPath, '--']
+    if not (scene is None):
+        command += ['--scene', scene]
+    if not (frames is None):
+        command += ['--frames', str(frames[0]), str(frames[1])]
+    command += ['--type'] + exportTypes
+    if suffix:
+        command += ['--suffix', suffix]
+
+    result = {'file': blendFile, 'scene': scene, 'suffix': suffix, 'files': [], 'warnings': [], 'error': None}
+    startTime = time.perf_counter()
+
+    try:
+        process = subprocess.run(command, stdout = subprocess.PIPE, stderr = subprocess.STDOUT, text = True, timeout = timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        result['error'] = str(e)
+        result['seconds'] = time.perf_counter() - startTime
+        return result
+
+    for line in process.stdout.splitlines():
+        if line.startswith(batchResultPrefix):
+            result.update(json.loads(line[len(batchResultPrefix):]))
+
+    if process.returncode != 0 and result['error'] is None:
+        output = process.stdout.strip().splitlines()
+        result['error'] = "Blender exited with code " + str(process.returncode) + (": " + output[-1] if output else "")
+
+    result['seconds'] = time.perf_counter() - startTime
+    return result
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Export Dragonframe Raw Move and Arc Move files from .blend files using background Blender processes.")
+    parser.add_argument('files', nargs = '+', help = ".blend files to export. Files are written next to each .blend file, like the panel export.")
+    parser.add_argument('--scene', action = 'append', help = "Scene to export from each file. Can be given more than once. Defaults to the active scene.")
+    parser.add_argument('--frames', nargs = 2, type = int, metavar = ('START', 'END'), help = "Frame range to export. Defaults to each scene's frame range.")
+    parser.add_argument('--type', nargs = '+', choices = ['raw', 'arc'], default = ['raw'], help = "File types to export.")
+    parser.add_argument('--jobs', type = int, default = os.cpu_count() or 1, help = "Number of Blender processes to run at once.")
+    parser.add_argument('--blender', default = shutil.which('blender') or 'blender', help = "Path to the Blender executable.")
+    parser.add_argument('--timeout', type = float, default = None, help = "Seconds after which a job is stopped and counted as failed.")
+    parser.add_argument('--json', action = 'store_true', help = "Print the summary as JSON.")
+    args = parser.parse_args(argv)
+
+    scenes = args.scene if args.scene else [None]
+    jobs = [(os.path.abspath(blendFile), scene) for blendFile in args.files for scene in scenes]
+
+    # The same file and scene twice would export to the same path
+    duplicates = sorted(set(job for job in jobs if jobs.count(job) > 1), key = str)
+    if duplicates:
+        parser.error("each file and scene can only be exported once: " + ", ".join(blendFile + " [" + str(scene or 'active scene') + "]" for blendFile, scene in duplicates))
+
+    startTime = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = max(1, args.jobs)) as pool:
+        # Only jobs that would write the same files get a suffix, which needs the export filenames set in each file
+        outputs = {}
+        if len(jobs) > 1:
+            blendFiles = sorted(set(blendFile for blendFile, scene in jobs))
+            for blendFile, fileOutputs in zip(blendFiles, pool.map(lambda blendFile: getOutputPaths(args.blender, blendFile, args.timeout), blendFiles)):
+                if not (fileOutputs is None):
+                    outputs[blendFile] = fileOutputs
+        suffixes = getJobSuffixes(jobs, outputs)
+        if not args.json:
+            for (blendFile, scene), suffix in zip(jobs, suffixes):
+                if suffix:
+                    print("Adding " + suffix + " to the export filename of " + blendFile + " [" + str(scene or 'active scene') + "], another job exports to the same files")
+
+        futures = [pool.submit(runJob, args.blender, blendFile, scene, args.frames, args.type, args.timeout, suffix) for (blendFile, scene), suffix in zip(jobs, suffixes)]
+        results = [future.result() for future in futures]
+    totalSeconds = time.perf_counter() - startTime
+
+    failed = [result for result in results if not (result['error'] is None)]
+
+    if args.json:
+        print(json.dumps({'jobs': results, 'failed': len(failed), 'seconds': totalSeconds}, indent = 2))
+    else:
+        for result in results:
+            status = 'OK    ' if result['error'] is None else 'FAILED'
+            print(status + " " + "%8.2fs" % result['seconds'] + "  " + result['file'] + " [" + str(result['scene'] or 'active scene') + "]")
+            for filepath in result['files']:
+                print("                    -> " + filepath)
+            for warning in result['warnings']:
+                print("                    " + warning)
+            if not (result['error'] is None):
+                print("                    " + result['error'])
+        print(str(len(results) - len(failed)) + " of " + str(len(results)) + " jobs succeeded in " + "%.2f" % totalSeconds + "s")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
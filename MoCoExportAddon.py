@@ -8,154 +8,648 @@ bl_info = {
 import bpy
 import bmesh
 import math
-from bpy.types import Panel, Operator
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import hashlib
+import re
+import collections
+import functools
+import socket
+import struct
+import threading
+import numpy as np
+from bpy.types import Panel, Operator, PropertyGroup, UIList
+from bpy.app.handlers import persistent
+from bpy_extras.io_utils import ImportHelper
 from mathutils import Vector
-from xml.etree import ElementTree as ET
-
-maxAxisCount = 36
-removeOperators = []
-moveUpOperators = []
-moveDownOperators = []
+from xml.sax.saxutils import escape
+from xml.etree import ElementTree
 
 props = None
 updatingAxisPositions = False
 exportingCameraMovement = False
+samplingFrames = False
 
 
-# Export movement functions
+# Profiling
+# With moco_profile on, each export records the wall time, call count and bytes written of its stages, and the frame
+# change handler records its time on every frame in a rolling window. Stage times are exclusive: time spent in a
+# nested stage, like writing the file while formatting it, is only counted in the nested stage, so the stages add up
+# to the export time. When profiling is off, stages use a shared no-op context manager and the file writer isn't
+# wrapped, so the instrumented code doesn't time anything.
+profileEnabled = False
+profileStats = collections.OrderedDict()
+profileStack = []
+profileStartTime = 0
+profileSummary = None
 
+handlerHistoryLength = 600
+handlerTimes = collections.deque(maxlen = handlerHistoryLength)
+handlerHistogramEdges = [0.1, 0.25, 0.5, 1, 2, 5, 10, 20]
 
 
+class ProfileStage:
+    def __init__(self, name):
+        self.name = name
+        self.childSeconds = 0
+        
+    def __enter__(self):
+        profileStack.append(self)
+        self.startTime = time.perf_counter()
+        return self
+    
+    def __exit__(self, excType, excValue, traceback):
+        seconds = time.perf_counter() - self.startTime
+        profileStack.pop()
+        addProfileTime(self.name, seconds - self.childSeconds)
+        if profileStack:
+            profileStack[-1].childSeconds += seconds
+        return False
+    
+    
+class NoProfileStage:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, excType, excValue, traceback):
+        return False
+    
+noProfileStage = NoProfileStage()
 
-class ExportMovement(Operator):
-    bl_idname = 'moco.exportmovement'
-    bl_label = 'Export camera movement for Dragonframe'
+
+def profileStage(name):
+    return ProfileStage(name) if profileEnabled else noProfileStage
+
+
+# Decorator that records every call of a function as a profile stage
+def profiled(name):
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with profileStage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def addProfileTime(name, seconds, calls = 1, numBytes = 0):
+    stats = profileStats.get(name)
+    if stats is None:
+        stats = profileStats[name] = {'calls': 0, 'seconds': 0.0, 'bytes': 0}
+    stats['calls'] += calls
+    stats['seconds'] += seconds
+    stats['bytes'] += numBytes
+
+
+# Start recording an export, if profiling is on for the scene. Clears the stages of the previous export.
+def startProfile(scene):
+    global profileEnabled, profileStartTime
+    profileEnabled = scene.moco_profile
+    profileStats.clear()
+    del profileStack[:]
+    profileStartTime = time.perf_counter()
     
-    positions = []
-    numFrames = 0
     
-    def saveFile(self, fileString, extension):
-        bpy.ops.wm.context_set_string(data_path="area.type", value="TEXT_EDITOR")
-        bpy.ops.text.new()
-        bpy.ops.text.insert(text = fileString)
-        bpy.ops.text.save_as(filepath = "//" + props.camera_path_file_name + extension)
-        bpy.ops.text.unlink()
-        bpy.ops.wm.context_set_string(data_path="area.type", value="VIEW_3D")
+# Stop recording an export and return its summary, or None if profiling is off. With moco_profile_sidecar, the
+# summary is also written as JSON next to the exported files.
+def finishProfile(scene, filepaths):
+    global profileEnabled, profileSummary
+    if not profileEnabled:
+        return None
+    profileEnabled = False
     
+    profileSummary = {'scene': scene.name, 'files': list(filepaths), 'axes': len(scene.moco_axes), 'frames': scene.frame_end - scene.frame_start + 1, 'seconds': time.perf_counter() - profileStartTime, 'stages': {name: dict(stats) for name, stats in profileStats.items()}, 'handler': getHandlerStats()}
     
-    # Raw export
-    def writeRaw(self):
-        rawMove = ""
-        
-        for frame in range(self.numFrames):
-            for axisIndex in range(props.moco_num_axis):
-                position = self.positions[axisIndex][frame]
-                component = getAxisComponent(axisIndex)
-                if component == 3 or component == 4 or component == 5:
-                    position = math.degrees(position)
-                entry = str(position) + "                "
-                rawMove = rawMove + entry[:12] + "    "
-            rawMove = rawMove + "\n"
+    if scene.moco_profile_sidecar and filepaths:
+        profileSummary['sidecar'] = bpy.path.abspath("//" + scene.camera_path_file_name + ".profile.json")
+        with open(profileSummary['sidecar'], 'w') as file:
+            json.dump(profileSummary, file, indent = 2)
+            
+    return profileSummary
+
+
+# Text for the operator report with the time of each stage of an export summary
+def getProfileReport(summary):
+    entries = []
+    for name, stats in summary['stages'].items():
+        entry = name + " " + "%.3f" % stats['seconds'] + "s"
+        if stats['calls'] > 1:
+            entry += " (" + str(stats['calls']) + " calls)"
+        if stats['bytes'] > 0:
+            entry += " " + "%.2f" % (stats['bytes'] / (1024 * 1024)) + " MB"
+        entries.append(entry)
+    return "Profile: " + "%.3f" % summary['seconds'] + "s total. " + ", ".join(entries)
+
+
+# Time, in ms, of the frame change handler over the recorded frames, with a histogram of counts between the
+# handlerHistogramEdges. Returns None if no frames were recorded.
+def getHandlerStats():
+    if not handlerTimes:
+        return None
+    times = np.array(handlerTimes) * 1000
+    histogram = np.bincount(np.searchsorted(handlerHistogramEdges, times, side = 'right'), minlength = len(handlerHistogramEdges) + 1)
+    return {'frames': len(times), 'meanMs': float(times.mean()), 'p95Ms': float(np.percentile(times, 95)), 'maxMs': float(times.max()), 'histogramEdgesMs': handlerHistogramEdges, 'histogram': histogram.tolist()}
+
+
+# Labels of the handler histogram bins
+def getHandlerHistogramLabels():
+    edges = ["%g" % edge for edge in handlerHistogramEdges]
+    return ["< " + edges[0] + " ms"] + [edges[index - 1] + "-" + edges[index] + " ms" for index in range(1, len(edges))] + [">= " + edges[-1] + " ms"]
+
+
+def clearHandlerTimes(self = None, context = None):
+    handlerTimes.clear()
+
+
+class ResetProfile(Operator):
+    bl_idname = 'moco.resetprofile'
+    bl_label = 'Reset profile'
+    bl_description = "Clear the recorded export stages and frame handler times"
+    
+    def execute(self, context):
+        global profileSummary
+        profileStats.clear()
+        profileSummary = None
+        clearHandlerTimes()
+        return {'FINISHED'}
+    
+    
+# Export movement functions
+
+# Buffered writer for export files. Streams into a temporary file next to the .blend file and
+# renames it over the export path once everything has been written, so a failed export never
+# leaves a partial file behind. The temporary file has a unique name, so exports of several scenes
+# running at once can't write into each other's file. While profiling, writes are timed and recorded
+# as the File write stage.
+class ExportFileWriter:
+    bufferSize = 1 << 20
+    
+    def __init__(self, extension):
+        self.filepath = bpy.path.abspath("//" + props.camera_path_file_name + extension)
+        self.tempFilepath = None
+        self.file = None
+        self.writeSeconds = 0
+        self.writeCalls = 0
+        if profileEnabled:
+            self.write = self.profiledWrite
         
-        self.saveFile(rawMove, '.txt')
-        self.report({'INFO'}, "Camera movement exported as Raw Move to " + bpy.path.abspath("//") + props.camera_path_file_name + '.txt') 
+    def __enter__(self):
+        # Created with a random name that must not exist yet, and with the mode of any new file, which the system
+        # reduces by the umask
+        while True:
+            self.tempFilepath = self.filepath + '.' + os.urandom(4).hex() + '.tmp'
+            try:
+                fileDescriptor = os.open(self.tempFilepath, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+                break
+            except FileExistsError:
+                continue
+        self.file = open(fileDescriptor, 'w', encoding = 'utf-8', newline = '', buffering = self.bufferSize)
+        return self
     
-    def modal(self, context, event):
-        global exportingCameraMovement
+    def write(self, text):
+        self.file.write(text)
         
-        if event.type == 'TIMER':
-            if context.scene.frame_current >= context.scene.frame_end:
-                self.writeRaw()
-                exportingCameraMovement = False
-                return {'FINISHED'}
+    def profiledWrite(self, text):
+        startTime = time.perf_counter()
+        self.file.write(text)
+        self.writeSeconds += time.perf_counter() - startTime
+        self.writeCalls += 1
+        
+    def __exit__(self, excType, excValue, traceback):
+        startTime = time.perf_counter()
+        self.file.close()
+        
+        if excType is None:
+            os.replace(self.tempFilepath, self.filepath)
+        elif os.path.exists(self.tempFilepath):
+            os.remove(self.tempFilepath)
+            
+        if profileEnabled:
+            seconds = self.writeSeconds + time.perf_counter() - startTime
+            addProfileTime('File write', seconds, self.writeCalls, os.path.getsize(self.filepath) if excType is None else 0)
+            if profileStack:
+                profileStack[-1].childSeconds += seconds
             
-            bpy.context.view_layer.update()
+        return False
             
-            for axis in range(props.moco_num_axis):
-                position = getAxisInputPosition(axis)
-                if position is None:
-                    position = 0
-                self.positions[axis].append(position)
+
+
+# Raw export columns are fixed point numbers with the Raw precision of the axis units, left aligned in
+# rawColumnWidth characters and followed by four spaces. Wider numbers widen their column instead of being cut.
+rawColumnWidth = 12
+rawChunkFrames = 4096
+
+# Number of decimals of an axis in Raw Move files
+def getRawPrecision(scene, entry):
+    if entry.isRotation:
+        return scene.moco_raw_precision_rotation
+    if entry.isFocus:
+        return scene.moco_raw_precision_focus
+    return scene.moco_raw_precision_length
+
+
+# Raw export. Rotations are converted to degrees and every axis is rounded to its precision for the whole move at
+# once, then each chunk of rows is formatted with a single % of a repeated row format. positions is an
+# (axes, frames) array. Returns the exported file path.
+@profiled('Raw formatting')
+def writeRawMove(positions):
+    entries = getAxisTable()
+    
+    # Without axes there are no positions to count the rows from, so the rows are the Raw Move sample times
+    positions = np.array(positions, dtype = np.float64)
+    numFrames = positions.shape[1] if positions.ndim == 2 else len(getSampleTimes(props))
+    positions = positions.reshape(len(entries), numFrames)
+    
+    rotation = [entry.index for entry in entries if entry.isRotation]
+    positions[rotation] = np.degrees(positions[rotation])
+    
+    # Values are only rounded by the format, since rounding them before would round half way values twice. Values
+    # that round to zero are set to 0.0, so they aren't written as -0.000. The half way limit itself rounds either
+    # way depending on its binary value, so the format decides.
+    precisions = [getRawPrecision(props, entry) for entry in entries]
+    for precision in set(precisions):
+        axes = [index for index, axisPrecision in enumerate(precisions) if axisPrecision == precision]
+        zeroLimit = 0.5 * 10.0 ** -precision
+        if float("%.*f" % (precision, zeroLimit)) == 0:
+            zeroLimit = np.nextafter(zeroLimit, 1)
+        values = positions[axes]
+        values[np.abs(values) < zeroLimit] = 0.0
+        positions[axes] = values
+    
+    rowFormat = "".join("%-" + str(rawColumnWidth) + "." + str(precision) + "f    " for precision in precisions) + "\n"
+    
+    with ExportFileWriter('.txt') as writer:
+        for chunkStart in range(0, numFrames, rawChunkFrames):
+            chunk = positions[:, chunkStart:chunkStart + rawChunkFrames]
+            writer.write((rowFormat * chunk.shape[1]) % tuple(chunk.T.ravel().tolist()))
                 
-            bpy.ops.screen.frame_offset(delta = 1)
-            self.numFrames += 1
-        
-        return {'PASS_THROUGH'}
+    return writer.filepath
+
+
+# Units label for an axis component, from the scene unit settings. None if Dragonframe has no matching unit.
+def getAxisUnits(scene, component):
+    units = None
+    if component == 0 or component == 1 or component == 2:
+        unitSystem = scene.unit_settings.system 
+        scaleLen = scene.unit_settings.scale_length
+        if unitSystem == 'METRIC':
+            if abs(scaleLen - 1) < 0.00001:
+                units = 'm'
+            elif abs(scaleLen - 0.01) < 0.00001:
+                units = 'cm'
+            elif abs(scaleLen - 0.001) < 0.00001:
+                units = 'mm'
+        elif unitSystem == 'IMPERIAL':
+            if abs(scaleLen - 1) < 0.00001:
+                units = 'in'
+    elif component == 3 or component == 4 or component == 5:
+        unitSystem = scene.unit_settings.system_rotation
+        if unitSystem == 'DEGREES':
+            units = 'deg'
+    return units
+
+
+# Keyframe reduction tolerance of an axis, in internal units
+def getAxisTolerance(scene, entry):
+    if entry.isRotation:
+        return scene.moco_arc_tolerance_rotation
+    if entry.isFocus:
+        return scene.moco_arc_tolerance_focus
+    return scene.moco_arc_tolerance_length
+
+
+# With moco_arc_reduce, only axes with at least this many keyframes per exported frame are refitted, like baked or
+# imported motion. Hand keyed axes are exported as they are.
+arcReduceMinKeyframeDensity = 0.2
+
+
+# Keyframes to export for an axis as (co, handleLeft, handleRight) arrays and the deviation of reduced keyframes,
+# in internal units. With moco_arc_reduce, the sampled motion of dense axes is refitted with as few keyframes as the
+# tolerance allows, and the original keyframes are kept with a deviation of 0 unless the fit needs fewer. World,
+# relative and focus axes have no axis keyframes, so they are always fitted from their sampled motion. Returns None
+# for axes without keyframes.
+def getArcMoveAxisKeyframes(scene, axisIndex, frames, positions):
+    entry = getAxisTable()[axisIndex]
+    if entry.readsTransform and not (entry.object is None):
+        co, handleLeft, handleRight, deviation = fitBezierKeyframes(frames, positions[axisIndex], getAxisTolerance(scene, entry))
+        return (co, handleLeft, handleRight), deviation
+    
+    fcurve = getAxisFCurve(axisIndex)
+    if fcurve is None or len(fcurve.keyframe_points) == 0:
+        return None, None
+    
+    keyframes = getKeyframeArrays(fcurve)[:3]
+    if not scene.moco_arc_reduce:
+        return keyframes, None
+    
+    numKeyframes = len(keyframes[0])
+    if numKeyframes >= len(frames) * arcReduceMinKeyframeDensity:
+        co, handleLeft, handleRight, deviation = fitBezierKeyframes(frames, positions[axisIndex], getAxisTolerance(scene, entry))
+        if len(co) < numKeyframes:
+            return (co, handleLeft, handleRight), deviation
+    
+    return keyframes, 0.0
+    
+
+# Arc Move XML is written element by element straight to the file. Output matches what ElementTree produced
+# before: same element layout, attribute order, escaping and self closing tags, but encoded as UTF-8.
+xmlAttributeEntities = {'"': '&quot;', '\n': '&#10;', '\r': '&#13;', '\t': '&#09;'}
 
+def xmlStartTag(tag, attributes, empty = False):
+    text = '<' + tag
+    for name, value in attributes:
+        text += ' ' + name + '="' + escape(value, xmlAttributeEntities) + '"'
+    return text + (' />' if empty else '>')
 
-    # XML Export
-    def exportXML(self, context):
-        root = ET.Element('scen:scene')
-        root.set('xmlns:scen', 'http://caliri.com/motion/scene')
-        root.set('endframe', str(context.scene.frame_end - context.scene.frame_start))
+
+# Frames at which Arc Move exports sample the axes, for keyframe reduction, World, Relative and Focus axes and the
+# limit check: every whole frame of the scene range
+def getArcMoveFrames(scene):
+    return np.arange(scene.frame_start, scene.frame_end + 1, dtype = np.float64)
+
+
+# XML Export. positions are the axes sampled at getArcMoveFrames, or None to sample them here when they are needed.
+# Returns the exported file path and the per axis deviations of reduced keyframes, or None.
+@profiled('Arc XML')
+def writeArcMove(scene, positions = None):
+    numAxes = len(props.moco_axes)
+    deviations = []
+    
+    frames = getArcMoveFrames(scene)
+    readsTransform = any(entry.readsTransform for entry in getAxisTable())
+    if positions is None and (scene.moco_arc_reduce or readsTransform):
+        positions = sampleAxisPositions(scene, frames)
+    
+    with ExportFileWriter('.arcm') as writer:
+        sceneAttributes = [('xmlns:scen', 'http://caliri.com/motion/scene'), ('endframe', str(scene.frame_end - scene.frame_start))]
+        writer.write(xmlStartTag('scen:scene', sceneAttributes, empty = numAxes == 0))
         
-        for axisIndex in range(props.moco_num_axis):
-            keyframes = getAxisKeyframes(axisIndex)
-            label = getAxisLabel(axisIndex)
+        for axisIndex in range(numAxes):
             component = getAxisComponent(axisIndex)
-            numKeyframes = len(keyframes)
-            
-            axis = ET.SubElement(root, 'scen:axis')
-            axis.set('name', label)
-            
-            units = None
-            if component == 0 or component == 1 or component == 2:
-                unitSystem = context.scene.unit_settings.system 
-                scaleLen = context.scene.unit_settings.scale_length
-                if unitSystem == 'METRIC':
-                    if abs(scaleLen - 1) < 0.00001:
-                        units = 'm'
-                    elif abs(scaleLen - 0.01) < 0.00001:
-                        units = 'cm'
-                    elif abs(scaleLen - 0.001) < 0.00001:
-                        units = 'mm'
-                elif unitSystem == 'IMPERIAL':
-                    if abs(scaleLen - 1) < 0.00001:
-                        units = 'in'
-            elif component == 3 or component == 4 or component == 5:
-                unitSystem = context.scene.unit_settings.system_rotation
-                if unitSystem == 'DEGREES':
-                    units = 'deg'
+            keyframes, deviation = getArcMoveAxisKeyframes(scene, axisIndex, frames, positions)
+            deviations.append(deviation)
             
+            axisAttributes = [('name', getAxisLabel(axisIndex))]
+            units = getAxisUnits(scene, component)
             if not (units is None):
-                axis.set('units', units)
+                axisAttributes.append(('units', units))
+            
+            if keyframes is None:
+                writer.write(xmlStartTag('scen:axis', axisAttributes, empty = True))
+                continue
+            writer.write(xmlStartTag('scen:axis', axisAttributes))
+            
+            co, handleLeft, handleRight = keyframes
+            numKeyframes = len(co)
             
             yMult = 1
             if component == 3 or component == 4 or component == 5:
                 yMult = 180 / math.pi
             
-            for index, keyframe in enumerate(keyframes):
-                point = ET.SubElement(axis, 'scen:points')
-                point.set('y', str(keyframe.co[1] * yMult))
-                point.set('x', str(keyframe.co[0]))
+            for x, y in co.tolist():
+                writer.write('<scen:points y="' + str(y * yMult) + '" x="' + str(x) + '" />')
             
-            for index, keyframe in enumerate(keyframes):
+            handleLeft = handleLeft.tolist()
+            handleRight = handleRight.tolist()
+            for index in range(numKeyframes):
                 if index > 0:
-                    controlpoint = ET.SubElement(axis, 'scen:controlPoints')
-                    controlpoint.set('y', str(keyframe.handle_left[1] * yMult))
-                    controlpoint.set('x', str(keyframe.handle_left[0]))
+                    x, y = handleLeft[index]
+                    writer.write('<scen:controlPoints y="' + str(y * yMult) + '" x="' + str(x) + '" />')
                 if index < numKeyframes - 1:
-                    controlpoint = ET.SubElement(axis, 'scen:controlPoints')
-                    controlpoint.set('y', str(keyframe.handle_right[1] * yMult))
-                    controlpoint.set('x', str(keyframe.handle_right[0]))
+                    x, y = handleRight[index]
+                    writer.write('<scen:controlPoints y="' + str(y * yMult) + '" x="' + str(x) + '" />')
+                    
+            writer.write('</scen:axis>')
             
-        self.saveFile(str(ET.tostring(root))[2:-1], '.arcm')
-        self.report({'INFO'}, "Camera movement exported as Arc Move XML to " + bpy.path.abspath("//") + props.camera_path_file_name + '.arcm') 
+        if numAxes > 0:
+            writer.write('</scen:scene>')
+        
+    return writer.filepath, deviations if scene.moco_arc_reduce or readsTransform else None
+
+
+# Text for the operator report listing the maximum deviation of each reduced axis
+def getDeviationReport(scene, deviations):
+    entries = []
+    for axisIndex, deviation in enumerate(deviations):
+        if deviation is None:
+            continue
+        component = getAxisComponent(axisIndex)
+        if component == 3 or component == 4 or component == 5:
+            deviation = math.degrees(deviation)
+        units = getAxisUnits(scene, component)
+        entries.append(getAxisLabel(axisIndex) + " " + "%.6g" % deviation + ("" if units is None else " " + units))
+    return "Max deviation: " + ", ".join(entries)
+
+
+# Kinematic limits
+# Velocity, acceleration and jerk of every axis are found with finite differences over the sampled move, all axes
+# at once. Limits are per second, in exported units: scene length units or degrees. A limit of 0 is not checked.
+kinematicLimitNames = ['velocity', 'acceleration', 'jerk']
+kinematicLimitAttributes = ['maxvelocity', 'maxacceleration', 'maxjerk']
+
+# Returns the limit violations of a sampled move as (axisIndex, order, firstFrame, lastFrame, peak, limit) tuples,
+# where order is 1 for velocity, 2 for acceleration and 3 for jerk. positions is an (axes, samples) array sampled at
+# times, in frames.
+@profiled('Limit check')
+def checkKinematicLimits(scene, positions, times):
+    violations = []
+    numAxes = len(props.moco_axes)
+    if numAxes == 0 or len(times) < 2:
+        return violations
+    
+    axes = [props.moco_axes[axisIndex] for axisIndex in range(numAxes)]
+    limits = np.array([[getattr(axis, attribute) for attribute in kinematicLimitAttributes] for axis in axes], dtype = np.float64)
+    limits[limits <= 0] = np.inf
+    if np.all(np.isinf(limits)):
+        return violations
+    
+    rotation = np.array([entry.isRotation for entry in getAxisTable()])
+    derivative = np.where(rotation[:, None], np.degrees(positions), positions)
+    sampleSeconds = (times[1] - times[0]) / (scene.render.fps / scene.render.fps_base)
+    
+    for order in range(1, 4):
+        if derivative.shape[1] < 2:
+            break
+        derivative = np.diff(derivative, axis = 1) / sampleSeconds
+        limit = limits[:, order - 1]
+        magnitude = np.abs(derivative)
+        exceeded = magnitude > limit[:, None]
+        if not exceeded.any():
+            continue
+        
+        # Start and end of each run of exceeded samples, from the edges of the padded mask
+        edges = np.diff(np.pad(exceeded.astype(np.int8), ((0, 0), (1, 1))), axis = 1)
+        starts = np.nonzero(edges == 1)
+        ends = np.nonzero(edges == -1)
+        for axisIndex, start, end in zip(starts[0].tolist(), starts[1].tolist(), ends[1].tolist()):
+            peak = float(magnitude[axisIndex, start:end].max())
+            violations.append((axisIndex, order, float(times[start]), float(times[end - 1 + order]), peak, float(limit[axisIndex])))
+            
+    violations.sort(key = lambda violation: (violation[0], violation[2], violation[1]))
+    return violations
+
+
+# Text for the operator report listing limit violations, at most maxEntries of them
+def getKinematicLimitsReport(scene, violations, maxEntries = 8):
+    entries = []
+    for axisIndex, order, firstFrame, lastFrame, peak, limit in violations[:maxEntries]:
+        component = getAxisComponent(axisIndex)
+        units = "deg" if getAxisTable()[axisIndex].isRotation else getAxisUnits(scene, component)
+        units = ("" if units is None else " " + units) + "/s" + ("" if order == 1 else str(order))
+        entries.append(getAxisLabel(axisIndex) + " " + kinematicLimitNames[order - 1] + " frames " + "%g-%g" % (firstFrame, lastFrame) + " peak " + "%.6g" % peak + units + " (limit " + "%.6g" % limit + ")")
+    if len(violations) > maxEntries:
+        entries.append("and " + str(len(violations) - maxEntries) + " more")
+    return "Kinematic limits exceeded: " + ", ".join(entries)
+
+
+# Sampled positions of the Raw Move, using playback sampling where F-curve sampling can't be used
+def sampleRawMovePositions(scene):
+    if props.moco_raw_sampling == '0' and not requiresPlaybackSampling():
+        return sampleAxisPositions(scene)
+    return sampleAxisPositionsByFrameSet(scene)
+
+
+# Export a scene without using the UI, window timers or screen operators, so it also works under blender -b.
+# exportTypes is a collection of moco_export_type values. Returns the exported file paths and the kinematic limit
+# violations of the move. With moco_limit_check set to Stop, nothing is exported if a limit is exceeded. The move is
+# sampled once and shared by the limit check and both file types where their sample times match.
+def exportSceneMovement(scene, exportTypes):
+    global props, exportingCameraMovement, profileEnabled
+    props = scene
+    exportingCameraMovement = True
+    invalidateFCurveIndex()
+    startProfile(scene)
+    
+    filepaths = []
+    violations = []
+    
+    # The export state is cleared however the export ends, also when it fails
+    try:
+        positions = None
+        times = None
+        arcPositions = None
+        if '0' in exportTypes:
+            times = getSampleTimes(scene)
+            positions = sampleRawMovePositions(scene)
+            if '1' in exportTypes and np.array_equal(times, getArcMoveFrames(scene)):
+                arcPositions = positions
+        elif '1' in exportTypes and props.moco_limit_check != '0':
+            times = getArcMoveFrames(scene)
+            positions = arcPositions = sampleAxisPositions(scene, times)
+        
+        if props.moco_limit_check != '0':
+            violations = checkKinematicLimits(scene, positions, times)
+            if violations and props.moco_limit_check == '2':
+                finishProfile(scene, filepaths)
+                return filepaths, violations
+        
+        if '0' in exportTypes:
+            filepaths.append(writeRawMove(positions))
+            
+        if '1' in exportTypes:
+            filepaths.append(writeArcMove(scene, arcPositions)[0])
+            
+        finishProfile(scene, filepaths)
+        return filepaths, violations
+    finally:
+        exportingCameraMovement = False
+        profileEnabled = False
+
+
+
+class ExportMovement(Operator):
+    bl_idname = 'moco.exportmovement'
+    bl_label = 'Export camera movement for Dragonframe'
+    
+    positions = []
+    numFrames = 0
+    
+    
+    # Playback sampling, one frame per timer tick. Fallback for axes that F-curve sampling can't evaluate.
+    def modal(self, context, event):
+        global exportingCameraMovement, profileEnabled
+        
+        if event.type == 'TIMER':
+            with profileStage('Scene evaluation'):
+                bpy.context.view_layer.update()
+                
+                for axis in range(len(props.moco_axes)):
+                    position = getAxisInputPosition(axis)
+                    if position is None:
+                        position = 0
+                    self.positions[axis].append(position)
+                
+            self.numFrames += 1
+            
+            if context.scene.frame_current >= context.scene.frame_end:
+                context.window_manager.event_timer_remove(self._timer)
+                exportingCameraMovement = False
+                try:
+                    if not self.checkLimits(context.scene, np.array(self.positions)):
+                        return {'CANCELLED'}
+                    filepath = writeRawMove(self.positions)
+                    self.report({'INFO'}, "Camera movement exported as Raw Move to " + filepath) 
+                    self.reportProfile(context.scene, [filepath])
+                    return {'FINISHED'}
+                finally:
+                    profileEnabled = False
+                
+            bpy.ops.screen.frame_offset(delta = 1)
+        
+        return {'PASS_THROUGH'}
+        
+    
+    # Report kinematic limit violations of the move sampled at times, which default to the Raw Move sample times.
+    # Returns False if the export should stop.
+    def checkLimits(self, scene, positions, times = None):
+        if props.moco_limit_check == '0':
+            return True
+        
+        violations = checkKinematicLimits(scene, positions, getSampleTimes(scene) if times is None else times)
+        if not violations:
+            return True
+        
+        if props.moco_limit_check == '2':
+            self.report({'ERROR'}, getKinematicLimitsReport(scene, violations) + ". Nothing was exported.")
+            finishProfile(scene, [])
+            return False
+        self.report({'WARNING'}, getKinematicLimitsReport(scene, violations))
+        return True
+        
+        
+    # Report the time taken by each export stage, if profiling is on
+    def reportProfile(self, scene, filepaths):
+        summary = finishProfile(scene, filepaths)
+        if not (summary is None):
+            self.report({'INFO'}, getProfileReport(summary))
         
     
     # Export button
     def execute(self, context):
-        global exportingCameraMovement
+        global exportingCameraMovement, profileEnabled
+        
+        if not bpy.data.is_saved:
+            self.report({'ERROR'}, "Save the Blender file first. Movement files are exported to the Blender file directory.")
+            return {'CANCELLED'}
+        
         exportingCameraMovement = True
+        invalidateFCurveIndex()
+        startProfile(context.scene)
         
-        if props.moco_export_type == '0':
+        # Playback sampling runs modal and clears the export state when it finishes or is cancelled. The other exports
+        # clear it however they end, also when they fail.
+        if props.moco_export_type == '0' and (props.moco_raw_sampling != '0' or requiresPlaybackSampling()) and isSampledPerFrame(context.scene):
             bpy.ops.screen.animation_cancel(restore_frame = False)
             bpy.ops.screen.frame_jump(end = False)
             
             self.positions = []
             self.numFrames = 0
             
-            for axis in range(props.moco_num_axis):
+            for axis in range(len(props.moco_axes)):
                 self.positions.append([])
                 
             wm = context.window_manager
@@ -164,101 +658,1267 @@ class ExportMovement(Operator):
             
             return {'RUNNING_MODAL'}
         
-        
-        elif props.moco_export_type == '1':
-            self.exportXML(context)
-            exportingCameraMovement = False
+        try:
+            if props.moco_export_type == '0':
+                positions = sampleRawMovePositions(context.scene)
+                exportingCameraMovement = False
+                if not self.checkLimits(context.scene, positions):
+                    return {'CANCELLED'}
+                
+                filepath = writeRawMove(positions)
+                self.report({'INFO'}, "Camera movement exported as Raw Move to " + filepath) 
+                self.reportProfile(context.scene, [filepath])
+                
+                return {'FINISHED'}
             
-            return {'FINISHED'}
+            elif props.moco_export_type == '1':
+                # Sampled once for both the limit check and the export, since World, Relative and Focus axes are
+                # sampled by setting every frame
+                positions = None
+                if props.moco_limit_check != '0':
+                    frames = getArcMoveFrames(context.scene)
+                    positions = sampleAxisPositions(context.scene, frames)
+                    if not self.checkLimits(context.scene, positions, frames):
+                        return {'CANCELLED'}
+                
+                filepath, deviations = writeArcMove(context.scene, positions)
+                self.report({'INFO'}, "Camera movement exported as Arc Move XML to " + filepath) 
+                if not (deviations is None):
+                    self.report({'INFO'}, getDeviationReport(context.scene, deviations))
+                self.reportProfile(context.scene, [filepath])
+                
+                return {'FINISHED'}
+        finally:
+            exportingCameraMovement = False
+            profileEnabled = False
 
     def cancel(self, context):
-        global exportingCameraMovement
+        global exportingCameraMovement, profileEnabled
         exportingCameraMovement = False
+        profileEnabled = False
         
         wm = context.window_manager
         wm.event_timer_remove(self._timer)
         
         
-# Axis utilities
-def getAxisObject(axisIndex):
-    global props
-    objectName = getattr(props, "moco_axis_object_" + str(axisIndex))
-    if not (bpy.data.objects.get(objectName) is None):
-        return bpy.context.scene.objects[objectName]
-    
-    
-def getAxisComponent(axisIndex):
-    global props
-    return int(getattr(props, "moco_axis_component_" + str(axisIndex)))
+# Import
+# Raw Move and Arc Move files are read back into the axis input F-curves, matching file columns or axes to the
+# scene axes by order or by label. Keyframes of each axis are replaced in bulk with keyframe_points.add and
+# foreach_set. World, relative and focus axes have no input to animate and are skipped.
+arcMoveNamespace = '{http://caliri.com/motion/scene}'
+
+# Handle type and interpolation values for foreach_set
+handleTypeFree = 0
+
+
+# Read a Raw Move file in chunks of lines, each converted by NumPy in one go. The first row may hold axis labels.
+# Returns the labels or None, and a (columns, rows) array of positions in exported units.
+def readRawMove(filepath):
+    labels = None
+    numColumns = None
+    chunks = []
+    
+    with open(filepath, 'r', encoding = 'utf-8', buffering = 1024 * 1024) as file:
+        while True:
+            lines = file.readlines(1024 * 1024)
+            if not lines:
+                break
+            
+            if numColumns is None:
+                lines = [line for line in lines if line.strip()]
+                if not lines:
+                    continue
+                firstRow = lines[0].split()
+                try:
+                    [float(value) for value in firstRow]
+                except ValueError:
+                    labels = firstRow
+                    lines = lines[1:]
+                numColumns = len(firstRow)
+                
+            chunks.append(np.array(" ".join(lines).split(), dtype = np.float64))
+            
+    if numColumns is None:
+        return labels, np.zeros((0, 0))
+    
+    values = np.concatenate(chunks)
+    if len(values) % numColumns != 0:
+        raise ValueError("Rows of " + os.path.basename(filepath) + " don't all have " + str(numColumns) + " columns")
+    return labels, values.reshape(-1, numColumns).T
+
+
+# Read an Arc Move file with a streaming XML parser. Returns the end frame and a list of (name, co, handleLeft,
+# handleRight) tuples, one per axis, in exported units. Keyframe arrays are None for axes without keyframes.
+def readArcMove(filepath):
+    endFrame = None
+    axes = []
+    
+    for event, element in ElementTree.iterparse(filepath, events = ('start', 'end')):
+        if event == 'start':
+            if element.tag == arcMoveNamespace + 'scene':
+                endFrame = float(element.get('endframe', 0))
+            continue
+        if element.tag != arcMoveNamespace + 'axis':
+            continue
+        
+        name = element.get('name', '')
+        co = np.array([(float(point.get('x')), float(point.get('y'))) for point in element.iter(arcMoveNamespace + 'points')]).reshape(-1, 2)
+        controlPoints = np.array([(float(point.get('x')), float(point.get('y'))) for point in element.iter(arcMoveNamespace + 'controlPoints')]).reshape(-1, 2)
+        element.clear()
+        
+        numKeyframes = len(co)
+        if numKeyframes == 0:
+            axes.append((name, None, None, None))
+            continue
+        if len(controlPoints) != 2 * numKeyframes - 2:
+            raise ValueError("Axis " + name + " has " + str(len(controlPoints)) + " control points for " + str(numKeyframes) + " points")
+        
+        # Control points are written as right handle of the first keyframe, then left and right handles of the
+        # following ones. The outer handles aren't stored and are mirrored from the inner ones.
+        handleLeft = np.empty((numKeyframes, 2))
+        handleRight = np.empty((numKeyframes, 2))
+        handleRight[:-1] = controlPoints[0::2]
+        handleLeft[1:] = controlPoints[1::2]
+        if numKeyframes > 1:
+            handleLeft[0] = 2 * co[0] - handleRight[0]
+            handleRight[-1] = 2 * co[-1] - handleLeft[-1]
+        else:
+            handleLeft[0] = co[0] - (1, 0)
+            handleRight[0] = co[0] + (1, 0)
+        axes.append((name, co, handleLeft, handleRight))
+        
+    return endFrame, axes
+
+
+# Axis indices for imported columns, matched by label or by order. None for columns without a matching axis.
+def getImportAxisIndices(labels, numColumns, byLabel):
+    axes = getAxisTable()
+    if byLabel and not (labels is None):
+        axisIndices = {}
+        for entry in reversed(axes):
+            axisIndices[entry.label] = entry.index
+        return [axisIndices.get(label) for label in labels]
+    return [columnIndex if columnIndex < len(axes) else None for columnIndex in range(numColumns)]
+
+
+# Replace the keyframes of an axis input F-curve in bulk. co, handleLeft and handleRight are (keyframes, 2) arrays
+# in internal units.
+def setAxisKeyframes(entry, co, handleLeft, handleRight, interpolation):
+    global props
+    
+    animationData = props.animation_data_create()
+    if animationData.action is None:
+        animationData.action = bpy.data.actions.new(props.name + "Action")
+        
+    fcurves = animationData.action.fcurves
+    fcurve = fcurves.find(entry.inputProperty)
+    if not (fcurve is None):
+        fcurves.remove(fcurve)
+    fcurve = fcurves.new(entry.inputProperty)
+    
+    numKeyframes = len(co)
+    points = fcurve.keyframe_points
+    points.add(numKeyframes)
+    points.foreach_set('co', np.ascontiguousarray(co, dtype = np.float32).ravel())
+    points.foreach_set('interpolation', np.full(numKeyframes, interpolation, dtype = np.int32))
+    points.foreach_set('handle_left_type', np.full(numKeyframes, handleTypeFree, dtype = np.int32))
+    points.foreach_set('handle_right_type', np.full(numKeyframes, handleTypeFree, dtype = np.int32))
+    points.foreach_set('handle_left', np.ascontiguousarray(handleLeft, dtype = np.float32).ravel())
+    points.foreach_set('handle_right', np.ascontiguousarray(handleRight, dtype = np.float32).ravel())
+    fcurve.update()
+    
+    invalidateFCurveIndex()
+    
+
+# Import a Raw Move file as linear keyframes on every row, starting at the scene start frame and spaced by the Raw
+# Move sample settings. Returns the labels of the imported axes and the number of skipped columns.
+def importRawMove(scene, filepath, byLabel, setFrameRange):
+    global props
+    props = scene
+    invalidateFCurveIndex()
+    
+    labels, positions = readRawMove(filepath)
+    numColumns, numRows = positions.shape
+    frames = scene.frame_start + np.arange(numRows, dtype = np.float64) * getSampleFrameStep(scene)
+    axisIndices = getImportAxisIndices(labels, numColumns, byLabel)
+    
+    imported = []
+    for columnIndex, axisIndex in enumerate(axisIndices):
+        if axisIndex is None or numRows == 0:
+            continue
+        entry = getAxisTable()[axisIndex]
+        if entry.readsTransform:
+            continue
+        
+        values = np.radians(positions[columnIndex]) if entry.isRotation else positions[columnIndex]
+        co = np.stack([frames, values], axis = 1)
+        setAxisKeyframes(entry, co, co, co, interpolationLinear)
+        imported.append(entry.label)
+        
+    if setFrameRange and numRows > 0:
+        scene.frame_end = int(math.ceil(frames[-1] - 0.000001))
+        
+    return imported, numColumns - len(imported)
+
+
+# Import an Arc Move file as bezier keyframes. Returns the labels of the imported axes and the number of skipped axes.
+def importArcMove(scene, filepath, byLabel, setFrameRange):
+    global props
+    props = scene
+    invalidateFCurveIndex()
+    
+    endFrame, axes = readArcMove(filepath)
+    axisIndices = getImportAxisIndices([axis[0] for axis in axes], len(axes), byLabel)
+    
+    imported = []
+    for (name, co, handleLeft, handleRight), axisIndex in zip(axes, axisIndices):
+        if axisIndex is None or co is None:
+            continue
+        entry = getAxisTable()[axisIndex]
+        if entry.readsTransform:
+            continue
+        
+        if entry.isRotation:
+            co, handleLeft, handleRight = [np.stack([keys[:, 0], np.radians(keys[:, 1])], axis = 1) for keys in (co, handleLeft, handleRight)]
+        setAxisKeyframes(entry, co, handleLeft, handleRight, interpolationBezier)
+        imported.append(entry.label)
+        
+    if setFrameRange and not (endFrame is None):
+        scene.frame_end = scene.frame_start + int(round(endFrame))
+        
+    return imported, len(axes) - len(imported)
+
+
+importMatchItems = (('0', 'By Order', 'Import columns or axes into the scene axes in order'), ('1', 'By Label', 'Import columns or axes into the scene axes with the same label'))
+
+
+# Import Raw Move button
+class ImportRawMove(Operator, ImportHelper):
+    bl_idname = 'moco.importrawmove'
+    bl_label = 'Import Raw Move'
+    
+    filename_ext = '.txt'
+    filter_glob: bpy.props.StringProperty(default = '*.txt', options = {'HIDDEN'})
+    match_axes: bpy.props.EnumProperty(items = importMatchItems, name = "Match Axes", description = "How file columns are matched to axes. Matching by label needs a first row of labels.")
+    set_frame_range: bpy.props.BoolProperty(name = "Set Frame Range", description = "Set the scene end frame to the last imported row.", default = True)
+    
+    def execute(self, context):
+        imported, skipped = importRawMove(context.scene, self.filepath, self.match_axes == '1', self.set_frame_range)
+        context.scene.frame_set(context.scene.frame_current)
+        self.report({'INFO'}, "Imported " + str(len(imported)) + " axes from Raw Move" + ("" if skipped == 0 else ", skipped " + str(skipped) + " columns without a matching axis input"))
+        return {'FINISHED'}
+    
+    
+# Import Arc Move button
+class ImportArcMove(Operator, ImportHelper):
+    bl_idname = 'moco.importarcmove'
+    bl_label = 'Import Arc Move'
+    
+    filename_ext = '.arcm'
+    filter_glob: bpy.props.StringProperty(default = '*.arcm', options = {'HIDDEN'})
+    match_axes: bpy.props.EnumProperty(items = importMatchItems, name = "Match Axes", description = "How Arc Move axes are matched to axes.")
+    set_frame_range: bpy.props.BoolProperty(name = "Set Frame Range", description = "Set the scene end frame from the Arc Move end frame.", default = True)
+    
+    def execute(self, context):
+        imported, skipped = importArcMove(context.scene, self.filepath, self.match_axes == '1', self.set_frame_range)
+        context.scene.frame_set(context.scene.frame_current)
+        self.report({'INFO'}, "Imported " + str(len(imported)) + " axes from Arc Move" + ("" if skipped == 0 else ", skipped " + str(skipped) + " axes without keyframes or a matching axis input"))
+        return {'FINISHED'}
+    
+    
+# Axis property paths
+# Axis settings live in the scene's moco_axes collection, so axis input F-curves have data paths like
+# moco_axes[2].setrot
+axisPathPattern = re.compile(r'^moco_axes\[(\d+)\]\.(\w+)$')
+
+def getAxisPropertyPath(axisIndex, attribute):
+    return 'moco_axes[' + str(axisIndex) + '].' + attribute
+
+
+# Axis table
+# Resolved settings for each axis: object reference, component, label and input property. Built once and reused
+# by playback, export and drawing, and rebuilt only when the axis setup changes, instead of building property
+# names and looking objects up by name for every axis on every call.
+axisTable = None
+axisTableKey = None
+
+
+class AxisTableEntry:
+    def __init__(self, scene, axisIndex):
+        self.index = axisIndex
+        self.axis = scene.moco_axes[axisIndex]
+        self.label = self.axis.label
+        self.component = int(self.axis.component)
+        self.isRotation = self.component == 3 or self.component == 4 or self.component == 5
+        self.isFocus = self.component == 6
+        
+        objectName = self.axis.object
+        self.object = scene.objects.get(objectName) if objectName else None
+        
+        # World, relative and focus axes are read from the evaluated object transform instead of driving the object.
+        # Focus axes measure the distance from the object to the reference object.
+        self.space = int(self.axis.space)
+        self.readsTransform = self.space != 0 or self.isFocus
+        referenceName = self.axis.reference
+        self.reference = scene.objects.get(referenceName) if (self.space == 2 or self.isFocus) and referenceName else None
+        
+        # Lens calibration as distance and motor position arrays sorted by distance, for np.interp
+        calibration = sorted((point.distance, point.position) for point in self.axis.focuscalibration)
+        self.focusDistances = np.array([point[0] for point in calibration], dtype = np.float64)
+        self.focusPositions = np.array([point[1] for point in calibration], dtype = np.float64)
+        
+        self.inputAttribute = 'setrot' if self.isRotation else 'setlength'
+        self.inputProperty = getAxisPropertyPath(axisIndex, self.inputAttribute)
+        self.lastPosition = None
+        
+    def getInput(self):
+        return getattr(self.axis, self.inputAttribute)
+    
+    def setInput(self, position):
+        setattr(self.axis, self.inputAttribute, position)
+        
+
+# The table is also rebuilt if the scene, axis count or number of objects changed since it was built,
+# which covers switching scenes. Objects deleted and added between two uses are caught by
+# depsgraphUpdateHandler.
+def getAxisTable():
+    global axisTable, axisTableKey, props
+    
+    key = (props.as_pointer(), len(props.moco_axes), len(bpy.data.objects))
+    if axisTable is None or key != axisTableKey:
+        axisTable = [AxisTableEntry(props, axisIndex) for axisIndex in range(len(props.moco_axes))]
+        axisTableKey = key
+        
+    return axisTable
+
+
+def invalidateAxisTable():
+    global axisTable
+    axisTable = None
+    
+
+@persistent
+def invalidateCachesHandler(*args):
+    invalidateAxisTable()
+    invalidateFCurveIndex()
+    
+    
+# F-curve index
+# Maps data paths to the F-curves of the scene action, so axis curves can be found without scanning every
+# F-curve in the action. Rebuilt when the action or its number of F-curves changes, and invalidated at the
+# start of every export or axis operation.
+fcurveIndex = None
+fcurveIndexKey = None
+
+
+def getFCurveIndex():
+    global fcurveIndex, fcurveIndexKey, props
+    
+    if props.animation_data is None or props.animation_data.action is None:
+        return {}
+    
+    action = props.animation_data.action
+    key = (action.as_pointer(), len(action.fcurves))
+    if fcurveIndex is None or key != fcurveIndexKey:
+        fcurveIndex = {}
+        for fcurve in action.fcurves:
+            fcurveIndex.setdefault(fcurve.data_path, fcurve)
+        fcurveIndexKey = key
+        
+    return fcurveIndex
+
+
+def invalidateFCurveIndex():
+    global fcurveIndex
+    fcurveIndex = None
+    
+
+# Number of objects in the file and in the scene at the last depsgraph update
+objectCounts = None
+
+
+# F-curves can be added, removed or renamed in the Graph Editor and Dope Sheet at any time. Objects can be
+# deleted and added too, which can leave the number of objects the same while an axis object is replaced, so the
+# axis table is invalidated on every update that changes the number of objects.
+@persistent
+def depsgraphUpdateHandler(scene, depsgraph = None):
+    global objectCounts
+    if depsgraph is None or depsgraph.id_type_updated('ACTION'):
+        invalidateFCurveIndex()
+    
+    counts = (len(bpy.data.objects), len(scene.objects))
+    if counts != objectCounts:
+        objectCounts = counts
+        invalidateAxisTable()
+    
+    
+# Axis utilities
+def getAxisComponent(axisIndex):
+    return getAxisTable()[axisIndex].component
+
+
+def getAxisLabel(axisIndex):
+    return getAxisTable()[axisIndex].label
+
+
+def getAxisDataPath(axisIndex):
+    return getAxisTable()[axisIndex].inputProperty
+
+
+def getAxisFCurve(axisIndex):
+    return getFCurveIndex().get(getAxisDataPath(axisIndex))
+
+
+def getAxisObjectPosition(axisIndex):
+    entry = getAxisTable()[axisIndex]
+    object = entry.object
+
+    if not (object is None):
+        component = entry.component
+        
+        if component == 0:
+            return object.location[0]
+        elif component == 1:
+            return object.location[1]
+        elif component == 2:
+            return object.location[2]
+        elif component == 3:
+            return object.rotation_euler[0]
+        elif component == 4:
+            return object.rotation_euler[1]
+        elif component == 5:
+            return object.rotation_euler[2]
+        
+        
+def getAxisInputPosition(axisIndex):
+    global props
+    
+    entry = getAxisTable()[axisIndex]
+    if entry.object is None:
+        return None
+    if entry.readsTransform:
+        return getCurrentTransformPosition(entry)
+    return entry.getInput()
+        
+
+# World and relative components
+# World and relative axes decompose the object's world matrix, so parents, constraints and drivers on the object
+# are all included. Matrices are handled as NumPy arrays in the column major layout that foreach_get returns,
+# matrix[column][row], many frames at a time.
+
+# Euler rotation orders as the indices of the first, second and third axis and the parity, as in Blender's
+# rotation order table
+eulerOrders = {'XYZ': (0, 1, 2, False), 'XZY': (0, 2, 1, True), 'YXZ': (1, 0, 2, True), 'YZX': (1, 2, 0, False), 'ZXY': (2, 0, 1, False), 'ZYX': (2, 1, 0, True)}
+
+# Euler angles of an (n, 3, 3) array of rotation matrices, the same as Matrix.to_euler(order). Scale is removed
+# first. Of the two Euler solutions, the one with the smaller angles is picked, like Blender does. Quaternion
+# and axis angle rotation modes use XYZ. Returns an (n, 3) array.
+def matricesToEuler(matrices, order):
+    i, j, k, parity = eulerOrders.get(order, eulerOrders['XYZ'])
+    
+    lengths = np.linalg.norm(matrices, axis = 2)
+    m = matrices / np.where(lengths > 0, lengths, 1)[:, :, None]
+    cy = np.hypot(m[:, i, i], m[:, i, j])
+    
+    euler1 = np.empty((len(m), 3))
+    euler2 = np.empty((len(m), 3))
+    euler1[:, i] = np.arctan2(m[:, j, k], m[:, k, k])
+    euler1[:, j] = np.arctan2(-m[:, i, k], cy)
+    euler1[:, k] = np.arctan2(m[:, i, j], m[:, i, i])
+    euler2[:, i] = np.arctan2(-m[:, j, k], -m[:, k, k])
+    euler2[:, j] = np.arctan2(-m[:, i, k], -cy)
+    euler2[:, k] = np.arctan2(-m[:, i, j], -m[:, i, i])
+    
+    # Gimbal lock, the first and third axes line up
+    locked = cy <= 16 * np.finfo(np.float32).eps
+    euler1[locked, i] = np.arctan2(-m[locked, k, j], m[locked, j, j])
+    euler1[locked, k] = 0
+    euler2[locked] = euler1[locked]
+    
+    if parity:
+        euler1 = -euler1
+        euler2 = -euler2
+        
+    useSecond = np.abs(euler2).sum(axis = 1) < np.abs(euler1).sum(axis = 1)
+    return np.where(useSecond[:, None], euler2, euler1)
+
+
+# Focus motor positions for camera to target distances, interpolated from the lens calibration of the axis.
+# Distances outside the calibration use the nearest calibration point. Without calibration, the distance itself
+# is the focus position.
+def getFocusPositions(entry, distances):
+    if len(entry.focusDistances) == 0:
+        return distances
+    return np.interp(distances, entry.focusDistances, entry.focusPositions)
+
+
+# Positions of world, relative and focus axes from sampled matrices. matrices is a (frames, objects, 4, 4) array of
+# world matrices of the objects named in objectNames. Rotations are unwrapped over the frames, so they don't jump by
+# a full turn between frames. Returns an (entries, frames) array.
+def getTransformAxisPositions(entries, matrices, objectNames):
+    positions = np.zeros((len(entries), matrices.shape[0]))
+    slots = {name: slot for slot, name in enumerate(objectNames)}
+    eulers = {}
+    
+    for entryIndex, entry in enumerate(entries):
+        referenceName = None if entry.reference is None else entry.reference.name
+        key = (entry.object.name, referenceName)
+        
+        if entry.isFocus:
+            distances = matrices[:, slots[entry.object.name], 3, :3]
+            if not (referenceName is None):
+                distances = distances - matrices[:, slots[referenceName], 3, :3]
+            positions[entryIndex] = getFocusPositions(entry, np.linalg.norm(distances, axis = 1))
+            continue
+        
+        if not entry.isRotation:
+            matrix = matrices[:, slots[entry.object.name]]
+            if not (referenceName is None):
+                matrix = np.matmul(matrix, np.linalg.inv(matrices[:, slots[referenceName]]))
+            positions[entryIndex] = matrix[:, 3, entry.component]
+            continue
+            
+        if not (key in eulers):
+            matrix = matrices[:, slots[entry.object.name]]
+            if not (referenceName is None):
+                matrix = np.matmul(matrix, np.linalg.inv(matrices[:, slots[referenceName]]))
+            eulers[key] = np.unwrap(matricesToEuler(matrix[:, :3, :3], entry.object.rotation_mode), axis = 0)
+        positions[entryIndex] = eulers[key][:, entry.component - 3]
+        
+    return positions
+
+
+# Distance from the object of a focus axis to its focus target at the current frame
+def getCurrentFocusDistance(entry):
+    offset = np.array(entry.object.matrix_world, dtype = np.float64)[:3, 3]
+    if not (entry.reference is None):
+        offset = offset - np.array(entry.reference.matrix_world, dtype = np.float64)[:3, 3]
+    return float(np.linalg.norm(offset))
+
+
+# Position of a world, relative or focus axis at the current frame
+def getCurrentTransformPosition(entry):
+    objects = [entry.object] if entry.reference is None else [entry.object, entry.reference]
+    matrices = np.array([[np.array(object.matrix_world, dtype = np.float64).T for object in objects]])
+    return float(getTransformAxisPositions([entry], matrices, [object.name for object in objects])[0, 0])
+        
+
+# Keyframe evaluation
+# Pure NumPy reimplementation of Blender's F-curve keyframe evaluation (fcurve_eval_keyframes),
+# so whole frame ranges can be evaluated in one batched pass. Nothing here touches bpy.
+
+# Keyframe interpolation values as stored by Blender and returned by foreach_get
+interpolationConstant = 0
+interpolationLinear = 1
+interpolationBezier = 2
+interpolationModes = {'CONSTANT': interpolationConstant, 'LINEAR': interpolationLinear, 'BEZIER': interpolationBezier}
+
+# Keys closer than this to the evaluation time are returned exactly, as Blender does
+keyframeThreshold = 0.0001
+
+
+# Read keyframe coordinates, handles and interpolation of an F-curve in bulk.
+# Returns (co, handleLeft, handleRight, interpolation, linearExtrapolation).
+def getKeyframeArrays(fcurve):
+    keyframes = fcurve.keyframe_points
+    numKeyframes = len(keyframes)
+    
+    arrays = []
+    for attribute in ['co', 'handle_left', 'handle_right']:
+        values = np.empty(numKeyframes * 2, dtype = np.float32)
+        keyframes.foreach_get(attribute, values)
+        arrays.append(values.reshape(numKeyframes, 2).astype(np.float64))
+    
+    interpolation = np.empty(numKeyframes, dtype = np.int32)
+    try:
+        keyframes.foreach_get('interpolation', interpolation)
+    except TypeError:
+        interpolation[:] = [interpolationModes.get(keyframe.interpolation, -1) for keyframe in keyframes]
+    
+    return arrays[0], arrays[1], arrays[2], interpolation, fcurve.extrapolation == 'LINEAR'
+
+
+# Whether the keyframe arrays only use interpolation modes that evaluateKeyframes supports
+def canEvaluateKeyframes(interpolation):
+    return bool(np.all((interpolation >= interpolationConstant) & (interpolation <= interpolationBezier)))
+
+
+# Evaluate cubic bezier segments (p0, p1, p2, p3 as (n, 2) arrays) at x positions. x(t) = x is solved with Newton
+# steps from the linear guess, kept inside a bisection bracket so a step that overshoots falls back to halving it.
+# Converges in a few steps for usual handles, and stops once every sample is within bezierSolveTolerance.
+bezierSolveTolerance = 1e-9
+bezierMaxIterations = 60
+
+def evaluateBezierSegments(p0, p1, p2, p3, x):
+    # Shorten handles that reach past the other end of the segment, so it can't loop back on itself, like
+    # BKE_fcurve_correct_bezpart. Each handle is clamped on its own.
+    h1 = p0 - p1
+    h2 = p3 - p2
+    length = p3[:, 0] - p0[:, 0]
+    handleLengths = [np.abs(h1[:, 0]), np.abs(h2[:, 0])]
+    scales = []
+    for handleLength in handleLengths:
+        scale = np.ones_like(length)
+        tooLong = handleLength > length
+        scale[tooLong] = length[tooLong] / handleLength[tooLong]
+        scales.append(scale)
+    p1 = p0 - scales[0][:, None] * h1
+    p2 = p3 - scales[1][:, None] * h2
+    
+    # Power basis of x(t) - x and y(t)
+    cx0 = p0[:, 0] - x
+    cx1 = 3 * (p1[:, 0] - p0[:, 0])
+    cx2 = 3 * (p0[:, 0] - 2 * p1[:, 0] + p2[:, 0])
+    cx3 = p3[:, 0] - p0[:, 0] + 3 * (p1[:, 0] - p2[:, 0])
+    
+    # Only the samples that haven't converged yet are stepped
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        t = np.clip(-cx0 / length, 0, 1)
+        t[~np.isfinite(t)] = 0.5
+        active = np.arange(len(x))
+        lower = np.zeros(len(x))
+        upper = np.ones(len(x))
+        for iteration in range(bezierMaxIterations):
+            ta = t[active]
+            xt = ((cx3[active] * ta + cx2[active]) * ta + cx1[active]) * ta + cx0[active]
+            unsolved = np.abs(xt) > bezierSolveTolerance
+            if not unsolved.any():
+                break
+            active = active[unsolved]
+            ta = ta[unsolved]
+            xt = xt[unsolved]
+            below = xt < 0
+            lower[active] = np.where(below, ta, lower[active])
+            upper[active] = np.where(below, upper[active], ta)
+            newton = ta - xt / ((3 * cx3[active] * ta + 2 * cx2[active]) * ta + cx1[active])
+            inside = (newton >= lower[active]) & (newton <= upper[active])
+            t[active] = np.where(inside, newton, (lower[active] + upper[active]) * 0.5)
+            
+    cy1 = 3 * (p1[:, 1] - p0[:, 1])
+    cy2 = 3 * (p0[:, 1] - 2 * p1[:, 1] + p2[:, 1])
+    cy3 = p3[:, 1] - p0[:, 1] + 3 * (p1[:, 1] - p2[:, 1])
+    return ((cy3 * t + cy2) * t + cy1) * t + p0[:, 1]
+
+
+# Evaluate keyframe arrays at every time in times. Matches Blender for CONSTANT, LINEAR and BEZIER
+# interpolation with constant or linear extrapolation. F-curve modifiers are not applied.
+def evaluateKeyframes(co, handleLeft, handleRight, interpolation, linearExtrapolation, times):
+    times = np.asarray(times, dtype = np.float64)
+    values = np.zeros(len(times))
+    numKeyframes = len(co)
+    
+    if numKeyframes == 0:
+        return values
+    
+    keyX = co[:, 0]
+    keyY = co[:, 1]
+    
+    # Extrapolation before the first and after the last keyframe. A single keyframe is both, and only extrapolates
+    # along its handles.
+    before = times <= keyX[0]
+    after = times >= keyX[-1]
+    for mask, endpoint, neighbor, handle in [(before, 0, 1, handleLeft), (after, -1, -2, handleRight)]:
+        if not mask.any():
+            continue
+        endX = keyX[endpoint]
+        endY = keyY[endpoint]
+        values[mask] = endY
+        
+        if not linearExtrapolation or interpolation[endpoint] == interpolationConstant:
+            continue
+        if interpolation[endpoint] == interpolationLinear:
+            if numKeyframes == 1:
+                continue
+            dx = keyX[neighbor] - endX
+            dy = keyY[neighbor] - endY
+        else:
+            dx = endX - handle[endpoint, 0]
+            dy = endY - handle[endpoint, 1]
+        if dx != 0:
+            values[mask] = endY - (dy / dx) * (endX - times[mask])
+    
+    # Interpolation between keyframes, using the interpolation mode of the segment's first keyframe
+    inside = ~(before | after)
+    if not inside.any():
+        return values
+    
+    x = times[inside]
+    previous = np.clip(np.searchsorted(keyX, x, side = 'right') - 1, 0, numKeyframes - 2)
+    following = previous + 1
+    result = np.empty(len(x))
+    mode = interpolation[previous]
+    
+    constant = mode == interpolationConstant
+    result[constant] = keyY[previous[constant]]
+    
+    linear = mode == interpolationLinear
+    if linear.any():
+        x0 = keyX[previous[linear]]
+        x1 = keyX[following[linear]]
+        y0 = keyY[previous[linear]]
+        y1 = keyY[following[linear]]
+        result[linear] = y0 + (x[linear] - x0) / (x1 - x0) * (y1 - y0)
+    
+    bezier = ~(constant | linear)
+    if bezier.any():
+        segmentStart = previous[bezier]
+        segmentEnd = following[bezier]
+        result[bezier] = evaluateBezierSegments(co[segmentStart], handleRight[segmentStart], handleLeft[segmentEnd], co[segmentEnd], x[bezier])
+    
+    # Times within the threshold of a keyframe return that keyframe's value exactly
+    for index in [previous, following]:
+        exact = np.abs(x - keyX[index]) < keyframeThreshold
+        result[exact] = keyY[index[exact]]
+    
+    values[inside] = result
+    return values
+    
+
+# Handle lengths tried for a segment, as fractions of its length, when handles at a third of the length come within
+# fittedHandleRange times the tolerance
+fittedHandleFractions = np.linspace(0.1, 0.6, 11)
+fittedHandleRange = 4
+
+
+# Fit sampled values y at frames x with as few bezier keyframes as possible while every sample stays within
+# tolerance. Handles follow the sampled slope at each keyframe. Segments start as cubic Hermite curves with
+# handles at a third of the segment length; a segment that is close to fitting also tries the handle lengths
+# in fittedHandleFractions and keeps the pair with the smallest deviation. Segments are split at their worst
+# sample until they fit, then keyframes that can be dropped without breaking the tolerance are removed.
+# Returns (co, handleLeft, handleRight, maxDeviation).
+@profiled('Keyframe fitting')
+def fitBezierKeyframes(x, y, tolerance):
+    x = np.asarray(x, dtype = np.float64)
+    y = np.asarray(y, dtype = np.float64)
+    numSamples = len(x)
+    slopes = np.gradient(y, x) if numSamples > 1 else np.zeros(numSamples)
+    
+    # Deviation, worst sample and handle length fractions of the segment between keyframes at sample indices start
+    # and end
+    def segmentError(start, end):
+        if end - start < 2:
+            return 0.0, start, 1 / 3, 1 / 3
+        dx = x[end] - x[start]
+        t = (x[start + 1:end] - x[start]) / dx
+        t2 = t * t
+        t3 = t2 * t
+        fitted = (2 * t3 - 3 * t2 + 1) * y[start] + (t3 - 2 * t2 + t) * dx * slopes[start] + (-2 * t3 + 3 * t2) * y[end] + (t3 - t2) * dx * slopes[end]
+        errors = np.abs(fitted - y[start + 1:end])
+        worst = int(np.argmax(errors))
+        error = float(errors[worst])
+        if error <= tolerance or error > tolerance * fittedHandleRange:
+            return error, start + 1 + worst, 1 / 3, 1 / 3
+        
+        # Every pair of handle fractions, evaluated for all samples of the segment at once
+        leftFractions, rightFractions = [fractions.ravel() for fractions in np.meshgrid(fittedHandleFractions, fittedHandleFractions)]
+        segmentSamples = end - start - 1
+        p0 = np.array([x[start], y[start]])
+        p3 = np.array([x[end], y[end]])
+        p1 = p0 + np.outer(leftFractions * dx, [1, slopes[start]])
+        p2 = p3 - np.outer(rightFractions * dx, [1, slopes[end]])
+        fitted = evaluateBezierSegments(np.tile(p0, (len(p1) * segmentSamples, 1)), np.repeat(p1, segmentSamples, axis = 0), np.repeat(p2, segmentSamples, axis = 0), np.tile(p3, (len(p1) * segmentSamples, 1)), np.tile(x[start + 1:end], len(p1)))
+        errors = np.abs(fitted.reshape(len(p1), segmentSamples) - y[start + 1:end])
+        best = int(np.argmin(errors.max(axis = 1)))
+        if errors[best].max() >= error:
+            return error, start + 1 + worst, 1 / 3, 1 / 3
+        worst = int(np.argmax(errors[best]))
+        return float(errors[best, worst]), start + 1 + worst, leftFractions[best], rightFractions[best]
+    
+    keys = [0]
+    if numSamples > 1:
+        stack = [(0, numSamples - 1)]
+        while len(stack) > 0:
+            start, end = stack.pop()
+            error, worst = segmentError(start, end)[:2]
+            if error > tolerance:
+                stack.append((worst, end))
+                stack.append((start, worst))
+            else:
+                keys.append(end)
+    
+        # Drop keyframes whose neighbours can be joined by a single segment
+        index = 1
+        while index < len(keys) - 1:
+            if segmentError(keys[index - 1], keys[index + 1])[0] <= tolerance:
+                del keys[index]
+            else:
+                index += 1
+    
+    fractions = np.array([segmentError(start, end)[2:] for start, end in zip(keys[:-1], keys[1:])]).reshape(-1, 2)
+    keys = np.array(keys)
+    co = np.stack([x[keys], y[keys]], axis = 1)
+    segmentLengths = np.diff(x[keys])
+    handleLeft = co.copy()
+    handleRight = co.copy()
+    handleLeft[1:, 0] -= segmentLengths * fractions[:, 1]
+    handleLeft[1:, 1] -= segmentLengths * fractions[:, 1] * slopes[keys[1:]]
+    handleRight[:-1, 0] += segmentLengths * fractions[:, 0]
+    handleRight[:-1, 1] += segmentLengths * fractions[:, 0] * slopes[keys[:-1]]
+    handleLeft[0] = co[0] - (handleRight[0] - co[0]) if len(keys) > 1 else co[0]
+    handleRight[-1] = co[-1] + (co[-1] - handleLeft[-1]) if len(keys) > 1 else co[-1]
+    
+    interpolation = np.full(len(keys), interpolationBezier)
+    fitted = evaluateKeyframes(co, handleLeft, handleRight, interpolation, False, x)
+    maxDeviation = float(np.max(np.abs(fitted - y))) if numSamples > 0 else 0.0
+    
+    return co, handleLeft, handleRight, maxDeviation
+
+
+# Sample cache
+# Sampled axis positions keyed by a hash of everything they depend on: keyframes, component, object, unit
+# settings and sample times. Kept in memory up to moco_sample_cache_size, and with the Disk setting also
+# saved as .npy files in a moco_cache folder next to the .blend file, which are loaded memory mapped.
+# Re-exporting a move then only re-evaluates the axes that were edited.
+sampleCache = collections.OrderedDict()
+sampleCacheBytes = 0
+sampleCacheFolderName = 'moco_cache'
+
+# Part of every cache key. Raised when evaluateKeyframes changes, so samples cached on disk by an older version
+# aren't reused.
+sampleCacheVersion = 2
+
+
+def getSampleCacheFolder():
+    if bpy.data.is_saved:
+        return bpy.path.abspath("//" + sampleCacheFolderName)
+    
+
+def getSampleCacheKey(scene, entry, keyframeArrays, frames):
+    digest = hashlib.sha1()
+    digest.update(str(sampleCacheVersion).encode())
+    for array in keyframeArrays[:4]:
+        digest.update(np.ascontiguousarray(array).tobytes())
+    unitSettings = scene.unit_settings
+    digest.update(repr((keyframeArrays[4], entry.component, entry.object.name, unitSettings.system, unitSettings.system_rotation, unitSettings.scale_length)).encode())
+    digest.update(np.ascontiguousarray(frames, dtype = np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def getCachedSamples(scene, key):
+    if key in sampleCache:
+        sampleCache.move_to_end(key)
+        return sampleCache[key]
+    
+    folder = getSampleCacheFolder()
+    if scene.moco_sample_cache == '2' and not (folder is None):
+        filepath = os.path.join(folder, key + '.npy')
+        if os.path.exists(filepath):
+            samples = np.load(filepath, mmap_mode = 'r')
+            os.utime(filepath)
+            addCachedSamples(scene, key, samples)
+            return samples
+        
+
+def addCachedSamples(scene, key, samples):
+    global sampleCacheBytes
+    
+    sampleCache[key] = samples
+    sampleCacheBytes += samples.nbytes
+    
+    maxBytes = scene.moco_sample_cache_size * 1024 * 1024
+    while sampleCacheBytes > maxBytes and len(sampleCache) > 1:
+        evictedKey, evictedSamples = sampleCache.popitem(last = False)
+        sampleCacheBytes -= evictedSamples.nbytes
+
+
+def storeCachedSamples(scene, key, samples):
+    addCachedSamples(scene, key, samples)
+    
+    folder = getSampleCacheFolder()
+    if scene.moco_sample_cache != '2' or folder is None:
+        return
+    
+    os.makedirs(folder, exist_ok = True)
+    # Batch exports of several scenes can store the same key at once, so each writes its own temporary file
+    filepath = os.path.join(folder, key + '.npy')
+    fileDescriptor, tempFilepath = tempfile.mkstemp(suffix = '.tmp', prefix = key + '.', dir = folder)
+    with open(fileDescriptor, 'wb') as file:
+        np.save(file, samples)
+    os.replace(tempFilepath, filepath)
+    
+    # Evict least recently used files once the folder is over the size limit
+    files = [os.path.join(folder, name) for name in os.listdir(folder) if name.endswith('.npy')]
+    files.sort(key = os.path.getmtime)
+    folderBytes = sum(os.path.getsize(file) for file in files)
+    maxBytes = scene.moco_sample_cache_size * 1024 * 1024
+    for file in files[:-1]:
+        if folderBytes <= maxBytes:
+            break
+        folderBytes -= os.path.getsize(file)
+        try:
+            os.remove(file)
+        except OSError:
+            pass
+        
+        
+def clearSampleCache():
+    global sampleCacheBytes
+    
+    sampleCache.clear()
+    sampleCacheBytes = 0
+    
+    removedFiles = 0
+    folder = getSampleCacheFolder()
+    if not (folder is None) and os.path.isdir(folder):
+        for name in os.listdir(folder):
+            if name.endswith('.npy'):
+                try:
+                    os.remove(os.path.join(folder, name))
+                    removedFiles += 1
+                except OSError:
+                    pass
+                
+    return removedFiles
+
+
+# Clear sample cache button
+class ClearSampleCache(Operator):
+    bl_idname = 'moco.clearsamplecache'
+    bl_label = 'Clear the cache of sampled axis positions'
+    
+    def execute(self, context):
+        removedFiles = clearSampleCache()
+        self.report({'INFO'}, "Sample cache cleared, " + str(removedFiles) + " cache files removed")
+        return {'FINISHED'}
+    
+    
+# Frames between Raw Move samples
+def getSampleFrameStep(scene):
+    if scene.moco_use_sample_rate:
+        return (scene.render.fps / scene.render.fps_base) / scene.moco_sample_rate
+    return 1 / scene.moco_samples_per_frame
+
+
+# Times to sample for Raw Move export, in frames, from the start to the end of the scene range. Either a whole number
+# of samples per frame, or a sample rate in Hz converted to frames with the scene frame rate.
+def getSampleTimes(scene):
+    frameRange = scene.frame_end - scene.frame_start
+    frameStep = getSampleFrameStep(scene)
+    numSamples = int(math.floor(frameRange / frameStep + 0.000001)) + 1
+    return scene.frame_start + np.arange(numSamples, dtype = np.float64) * frameStep
+
+
+# Sample every axis input straight from its F-curve at each sample time, without moving the playhead. frames defaults
+# to the Raw Move sample times. Returns an (axes, frames) array.
+@profiled('Sampling')
+def sampleAxisPositions(scene, frames = None):
+    if frames is None:
+        frames = getSampleTimes(scene)
+    positions = np.zeros((len(props.moco_axes), len(frames)))
+    
+    transformAxes = [entry.index for entry in getAxisTable() if entry.readsTransform and not (entry.object is None)]
+    if transformAxes:
+        positions[transformAxes] = sampleAxisPositionsByFrameSet(scene, frames, transformAxes)[transformAxes]
+    
+    for axisIndex in range(len(props.moco_axes)):
+        if getAxisTable()[axisIndex].readsTransform:
+            continue
+        position = getAxisInputPosition(axisIndex)
+        if position is None:
+            continue
+        
+        fcurve = getAxisFCurve(axisIndex)
+        if fcurve is None:
+            positions[axisIndex] = position
+            continue
+        
+        keyframeArrays = getKeyframeArrays(fcurve)
+        if len(fcurve.modifiers) > 0 or not canEvaluateKeyframes(keyframeArrays[3]):
+            positions[axisIndex] = [fcurve.evaluate(frame) for frame in frames]
+        elif scene.moco_sample_cache == '0':
+            positions[axisIndex] = evaluateKeyframes(*keyframeArrays, frames)
+        else:
+            key = getSampleCacheKey(scene, getAxisTable()[axisIndex], keyframeArrays, frames)
+            samples = getCachedSamples(scene, key)
+            if samples is None:
+                samples = evaluateKeyframes(*keyframeArrays, frames)
+                storeCachedSamples(scene, key, samples)
+            positions[axisIndex] = samples
+            
+    return positions
+
+
+# Set the scene to each frame in turn, using subframes between frames, and read the world matrices of the named
+# objects with one foreach_get of all scene objects per frame. onFrame is called with the frame index after each
+# frame is set. Returns a (frames, objects, 4, 4) array of column major matrices.
+@profiled('Scene evaluation')
+def sampleWorldMatrices(scene, objectNames, frames, onFrame = None):
+    objectIndices = [scene.objects.find(name) for name in objectNames]
+    matrices = np.empty((len(frames), len(objectNames), 4, 4))
+    buffer = np.empty(len(scene.objects) * 16, dtype = np.float32)
+    frameCurrent = scene.frame_current
+    
+    global samplingFrames
+    samplingFrames = True
+    try:
+        for frameIndex, frame in enumerate(np.asarray(frames).tolist()):
+            wholeFrame = math.floor(frame)
+            scene.frame_set(wholeFrame, subframe = frame - wholeFrame)
+            if not (onFrame is None):
+                onFrame(frameIndex)
+            
+            # frame_set evaluates the depsgraph and copies the evaluated world matrices back to the scene objects
+            if objectNames:
+                scene.objects.foreach_get('matrix_world', buffer)
+                matrices[frameIndex] = buffer.reshape(-1, 4, 4)[objectIndices]
+        scene.frame_set(frameCurrent)
+    finally:
+        samplingFrames = False
+                
+    return matrices
+
+
+# Sample axis inputs by setting the scene to each sample time in turn, using subframes between frames. Slower than
+# sampleAxisPositions but picks up drivers and NLA strips, and unlike the timer driven export it doesn't need a window.
+# World and relative axes are read in the same pass, with one foreach_get of the world matrices of all scene objects
+# per frame. frames defaults to the Raw Move sample times and axisIndices to all axes. Returns an (axes, frames)
+# array, with zeros for axes that weren't sampled.
+def sampleAxisPositionsByFrameSet(scene, frames = None, axisIndices = None):
+    if frames is None:
+        frames = getSampleTimes(scene)
+    entries = [entry for entry in getAxisTable() if not (entry.object is None)]
+    if not (axisIndices is None):
+        entries = [entry for entry in entries if entry.index in axisIndices]
+    inputAxes = [entry for entry in entries if not entry.readsTransform]
+    transformAxes = [entry for entry in entries if entry.readsTransform]
+    
+    # Objects and reference objects of world and relative axes
+    objectNames = sorted(set([entry.object.name for entry in transformAxes] + [entry.reference.name for entry in transformAxes if not (entry.reference is None)]))
+    positions = np.zeros((len(props.moco_axes), len(frames)))
+    
+    def readInputs(frameIndex):
+        for entry in inputAxes:
+            positions[entry.index, frameIndex] = entry.getInput()
+            
+    matrices = sampleWorldMatrices(scene, objectNames, frames, readInputs)
+    
+    if transformAxes:
+        positions[[entry.index for entry in transformAxes]] = getTransformAxisPositions(transformAxes, matrices, objectNames)
+    return positions
+
+
+# Bake
+# Object animation, drivers, constraints and parenting are sampled into the axis input curves, so the axis inputs
+# become the single source of the motion. The baked value of an axis is the visual local transform of its object:
+# the location or rotation that gives the evaluated world transform under the object's parent.
+
+# Visual local positions of axes from sampled world matrices of their objects and parents, in the layout returned
+# by sampleWorldMatrices. Returns an (entries, frames) array.
+def getVisualAxisPositions(entries, matrices, objectNames):
+    positions = np.zeros((len(entries), matrices.shape[0]))
+    slots = {name: slot for slot, name in enumerate(objectNames)}
+    localMatrices = {}
+    eulers = {}
+    
+    for entryIndex, entry in enumerate(entries):
+        object = entry.object
+        if not (object.name in localMatrices):
+            matrix = matrices[:, slots[object.name]]
+            if not (object.parent is None):
+                parentInverse = np.array(object.matrix_parent_inverse, dtype = np.float64).T
+                matrix = np.matmul(matrix, np.linalg.inv(np.matmul(parentInverse, matrices[:, slots[object.parent.name]])))
+            localMatrices[object.name] = matrix
+        matrix = localMatrices[object.name]
+        
+        if not entry.isRotation:
+            positions[entryIndex] = matrix[:, 3, entry.component]
+            continue
+        
+        if not (object.name in eulers):
+            eulers[object.name] = np.unwrap(matricesToEuler(matrix[:, :3, :3], object.rotation_mode), axis = 0)
+        positions[entryIndex] = eulers[object.name][:, entry.component - 3]
+        
+    return positions
 
 
-def getAxisLabel(axisIndex):
-    global props
-    return getattr(props, "moco_axis_label_" + str(axisIndex))
+# Location and rotation channels driven by each constraint type, as (data path, array index) pairs. Types that
+# only limit or copy some axes list them per axis, by the constraint settings that turn each axis on. Types not
+# listed here, like Child Of or Copy Transforms, drive every channel.
+locationChannels = [('location', index) for index in range(3)]
+rotationChannels = [('rotation_euler', index) for index in range(3)]
+constraintAxisSettings = {
+    'COPY_LOCATION': ('location', [['use_x'], ['use_y'], ['use_z']]),
+    'LIMIT_LOCATION': ('location', [['use_min_x', 'use_max_x'], ['use_min_y', 'use_max_y'], ['use_min_z', 'use_max_z']]),
+    'COPY_ROTATION': ('rotation_euler', [['use_x'], ['use_y'], ['use_z']]),
+    'LIMIT_ROTATION': ('rotation_euler', [['use_limit_x'], ['use_limit_y'], ['use_limit_z']]),
+}
+constraintChannels = {
+    'LIMIT_DISTANCE': locationChannels,
+    'FLOOR': locationChannels,
+    'CLAMP_TO': locationChannels,
+    'TRACK_TO': rotationChannels,
+    'DAMPED_TRACK': rotationChannels,
+    'LOCKED_TRACK': rotationChannels,
+    'STRETCH_TO': rotationChannels,
+    'COPY_SCALE': [],
+    'LIMIT_SCALE': [],
+    'MAINTAIN_VOLUME': [],
+}
 
+def getConstraintChannels(constraint):
+    if constraint.type in constraintAxisSettings:
+        dataPath, axisSettings = constraintAxisSettings[constraint.type]
+        return set((dataPath, index) for index, settings in enumerate(axisSettings) if any(getattr(constraint, setting) for setting in settings))
+    if constraint.type in constraintChannels:
+        return set(constraintChannels[constraint.type])
+    if constraint.type == 'TRANSFORM':
+        return set({'LOCATION': locationChannels, 'ROTATION': rotationChannels}.get(constraint.map_to, []))
+    if constraint.type == 'FOLLOW_PATH':
+        return set(locationChannels + (rotationChannels if constraint.use_curve_follow else []))
+    if constraint.type == 'SHRINKWRAP':
+        return set(locationChannels + (rotationChannels if constraint.use_track_normal else []))
+    return set(locationChannels + rotationChannels)
 
-def getAxisKeyframes(axisIndex):
-    global props
-    if not (props.animation_data is None):
-        component = getAxisComponent(axisIndex)
-        pathName = None
-        if component == 0 or component == 1 or component == 2:
-            pathName = 'moco_axis_setlength_'
-        elif component == 3 or component == 4 or component == 5:
-            pathName = 'moco_axis_setrot_'
+
+def getAxisChannel(entry):
+    return ('rotation_euler', entry.component - 3) if entry.isRotation else ('location', entry.component)
+
+
+# Mute or remove the object F-curves and drivers of baked channels, and the constraints whose location and rotation
+# channels were all baked. Constraints that also drive channels that weren't baked are left as they are, and
+# constraints that only affect scale are never touched. Returns the kept constraints as "object: constraint" names.
+def releaseObjectAnimation(entries, clear):
+    keptConstraints = []
+    for entry in entries:
+        animationData = entry.object.animation_data
+        if animationData is None:
+            continue
         
-        for fcurve in props.animation_data.action.fcurves:
-            if fcurve.data_path == pathName + str(axisIndex):
-                return fcurve.keyframe_points
-            elif fcurve.data_path == pathName + str(axisIndex):
-                return fcurve.keyframe_points
+        dataPath, arrayIndex = getAxisChannel(entry)
         
+        for fcurves in ([] if animationData.action is None else [animationData.action.fcurves]) + [animationData.drivers]:
+            for fcurve in [fcurve for fcurve in fcurves if fcurve.data_path == dataPath and fcurve.array_index == arrayIndex]:
+                if clear:
+                    fcurves.remove(fcurve)
+                else:
+                    fcurve.mute = True
+                    
+    # Constraints are only released when every location and rotation channel they drive was baked
+    for object in set(entry.object for entry in entries):
+        bakedChannels = set(getAxisChannel(entry) for entry in entries if entry.object == object)
+        for constraint in list(object.constraints):
+            channels = getConstraintChannels(constraint)
+            if not channels or not channels.issubset(bakedChannels):
+                if not constraint.mute:
+                    keptConstraints.append(object.name + ": " + constraint.name)
+            elif clear:
+                object.constraints.remove(constraint)
+            else:
+                constraint.mute = True
+                
+    return keptConstraints
+                
 
-def getAxisObjectPosition(axisIndex):
+# Bake the motion of the axis objects over the scene frame range into the axis input curves, as linear keyframes on
+# every frame or reduced to the Arc Move tolerances. Axes with animated inputs are only baked with overwrite.
+# original is '0' to keep, '1' to mute or '2' to remove the object animation that the baked axes replace.
+# Returns the labels of the baked axes and the names of constraints that were kept because they also drive channels
+# that weren't baked.
+def bakeAxes(scene, reduce, overwrite, original):
     global props
+    props = scene
+    invalidateFCurveIndex()
     
-    object = getAxisObject(axisIndex)
-
-    if not (object is None):
-        component = getAxisComponent(axisIndex)
-        
-        if component == 0:
-            return object.location[0]
-        elif component == 1:
-            return object.location[1]
-        elif component == 2:
-            return object.location[2]
-        elif component == 3:
-            return object.rotation_euler[0]
-        elif component == 4:
-            return object.rotation_euler[1]
-        elif component == 5:
-            return object.rotation_euler[2]
-        
+    entries = [entry for entry in getAxisTable() if not (entry.object is None or entry.readsTransform)]
+    if not overwrite:
+        entries = [entry for entry in entries if not (entry.inputProperty in getFCurveIndex())]
+    if not entries:
+        return [], []
+    
+    objects = set(entry.object for entry in entries)
+    objectNames = sorted(set([object.name for object in objects] + [object.parent.name for object in objects if not (object.parent is None)]))
+    frames = np.arange(scene.frame_start, scene.frame_end + 1, dtype = np.float64)
+    positions = getVisualAxisPositions(entries, sampleWorldMatrices(scene, objectNames, frames), objectNames)
+    
+    for entry, values in zip(entries, positions):
+        if reduce:
+            co, handleLeft, handleRight, deviation = fitBezierKeyframes(frames, values, getAxisTolerance(scene, entry))
+            setAxisKeyframes(entry, co, handleLeft, handleRight, interpolationBezier)
+        else:
+            co = np.stack([frames, values], axis = 1)
+            setAxisKeyframes(entry, co, co, co, interpolationLinear)
+            
+    keptConstraints = []
+    if original != '0':
+        keptConstraints = releaseObjectAnimation(entries, original == '2')
         
-def getAxisInputPosition(axisIndex):
-    global props
+    scene.frame_set(scene.frame_current)
+    return [entry.label for entry in entries], keptConstraints
+
+
+# Bake button
+class BakeAxes(Operator):
+    bl_idname = 'moco.bakeaxes'
+    bl_label = 'Bake object animation into axes'
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    reduce: bpy.props.BoolProperty(name = "Reduce Keyframes", description = "Fit as few keyframes as the Arc Move tolerances allow, instead of a keyframe on every frame.", default = True)
+    overwrite: bpy.props.BoolProperty(name = "Overwrite Animated Axes", description = "Also bake axes whose position is already animated, replacing their keyframes.", default = False)
+    original: bpy.props.EnumProperty(items = (('0', 'Keep', 'Leave the object animation, drivers and constraints as they are'), ('1', 'Mute', 'Mute the object animation and drivers that the axes replace, and constraints whose location and rotation channels were all baked'), ('2', 'Clear', 'Remove the object animation and drivers that the axes replace, and constraints whose location and rotation channels were all baked')), name = "Original Animation", description = "What to do with the object animation once it is baked into the axes.", default = '1')
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+    
+    def execute(self, context):
+        baked, keptConstraints = bakeAxes(context.scene, self.reduce, self.overwrite, self.original)
+        if not baked:
+            self.report({'WARNING'}, "No axes to bake. Only Axis Input axes with an object are baked, and animated ones only with Overwrite Animated Axes.")
+            return {'CANCELLED'}
+        self.report({'INFO'}, "Baked " + str(len(baked)) + " axes: " + ", ".join(baked))
+        if keptConstraints:
+            self.report({'WARNING'}, "Kept constraints that also drive channels that weren't baked: " + ", ".join(keptConstraints))
+        return {'FINISHED'}
+    
     
-    object = getAxisObject(axisIndex)
+# Whether Raw Move export samples exactly once per frame. The timer driven playback export can only step whole frames.
+def isSampledPerFrame(scene):
+    sampleTimes = getSampleTimes(scene)
+    return len(sampleTimes) == scene.frame_end - scene.frame_start + 1 and np.all(sampleTimes == np.round(sampleTimes))
 
-    if not (object is None):
-        component = getAxisComponent(axisIndex)
-        if component == 0 or component == 1 or component == 2:
-            return getattr(props, "moco_axis_setlength_" + str(axisIndex))
-        elif component == 3 or component == 4 or component == 5:
-            return getattr(props, "moco_axis_setrot_" + str(axisIndex))
+
+# Drivers and NLA strips are only applied by a scene update, so axes using them have to be sampled by playback
+def requiresPlaybackSampling():
+    global props
+    
+    animationData = props.animation_data
+    if animationData is None:
+        return False
+    
+    if animationData.use_nla and len(animationData.nla_tracks) > 0:
+        return True
+    
+    driverPaths = set(driver.data_path for driver in animationData.drivers)
+    for axisIndex in range(len(props.moco_axes)):
+        if getAxisDataPath(axisIndex) in driverPaths:
+            return True
         
+    return False
+
 
-def swapAxisFCurves(axisIndex1, axisIndex2):
+# Move axis F-curves to new axis slots in a single pass over the action. indexMap maps old axis indices
+# to new ones. F-curves of axes mapped to None are removed, axes not in the map are left alone.
+def remapAxisFCurves(indexMap):
     global props
     
-    if not (props.animation_data is None) and not (props.animation_data.action is None):
-        for fcurve in props.animation_data.action.fcurves:
-            for pathName in ['moco_axis_setlength_', 'moco_axis_setrot_']:
-                if fcurve.data_path == pathName + str(axisIndex1):
-                    fcurve.data_path = pathName + str(axisIndex2)
-                elif fcurve.data_path == pathName + str(axisIndex2):
-                    fcurve.data_path = pathName + str(axisIndex1)
+    if props.animation_data is None or props.animation_data.action is None:
+        return
+    
+    fcurves = props.animation_data.action.fcurves
+    removedFCurves = []
+    
+    for fcurve in fcurves:
+        match = axisPathPattern.match(fcurve.data_path)
+        if not (match is None) and int(match.group(1)) in indexMap:
+            newIndex = indexMap[int(match.group(1))]
+            if newIndex is None:
+                removedFCurves.append(fcurve)
+            else:
+                fcurve.data_path = getAxisPropertyPath(newIndex, match.group(2))
+                        
+    for fcurve in removedFCurves:
+        fcurves.remove(fcurve)
+        
+    invalidateFCurveIndex()
     
 
 
@@ -268,185 +1928,503 @@ class AddAxis(Operator):
     bl_label = 'Add a moco movement axis'
  
     def execute(self, context):
-        global props, maxAxisCount
+        global props
         
-        if props.moco_num_axis < maxAxisCount:
-            props.moco_num_axis += 1
-            
-            setattr(props, "moco_axis_component_" + str(props.moco_num_axis - 1), str((props.moco_num_axis - 1) % 6))
-            setattr(props, "moco_axis_object_" + str(props.moco_num_axis - 1),  "")
+        axis = props.moco_axes.add()
+        axis.component = str((len(props.moco_axes) - 1) % 6)
+        props.moco_axis_index = len(props.moco_axes) - 1
+        invalidateAxisTable()
+        
+        return {'FINISHED'}
+
+
+# Remove axis button
+class RemoveAxis(Operator):
+    bl_idname = 'moco.removemovementaxis'
+    bl_label = 'Remove moco movement axis'
+    
+    index: bpy.props.IntProperty()
+    
+    def execute(self, context):
+        global props
+        
+        indexMap = {i: i - 1 for i in range(self.index + 1, len(props.moco_axes))}
+        indexMap[self.index] = None
+        
+        if not (0 <= self.index < len(props.moco_axes)):
+            return {'CANCELLED'}
         
+        props.moco_axes.remove(self.index)
+        remapAxisFCurves(indexMap)
+        props.moco_axis_index = min(props.moco_axis_index, len(props.moco_axes) - 1)
+        
+        invalidateAxisTable()
+        updatePositionInputs()
         return {'FINISHED'}
 
 
-# Create button operators for each axis slot
-for i in range(maxAxisCount):
+# Add a lens calibration point to a focus axis, at the current distance and focus position
+class AddFocusPoint(Operator):
+    bl_idname = 'moco.addfocuspoint'
+    bl_label = 'Add a lens calibration point at the current focus distance'
+    
+    index: bpy.props.IntProperty()
     
-    # Remove axis button
-    class RemoveAxis(Operator):
-        index = i
-        bl_idname = 'moco.removemovementaxis' + str(index)
-        bl_label = 'Remove moco movement axis'
+    def execute(self, context):
+        global props
         
-        def execute(self, context):
-            global props, updatingAxisSlots
-            updatingAxisPositions = True
- 
-            for i in range(self.index, props.moco_num_axis):
-                for propName in ['moco_axis_component_', 'moco_axis_object_', 'moco_axis_label_']:
-                    setattr(props, propName + str(i), getattr(props, propName + str(i + 1)))
-                    
-                swapAxisFCurves(i, i + 1)
-                
-            props.moco_num_axis -= 1
-            updatePositionInputs()
-            return {'FINISHED'}
-
-    # Move axis up button
-    class MoveAxisUp(Operator):
-        index = i
-        bl_idname = 'moco.moveaxisup' + str(index)
-        bl_label = 'Move axis up'
-        
-        def execute(self, context):
-            global props, updatingAxisSlots
-            updatingAxisPositions = True
-
-            for propName in ['moco_axis_component_', 'moco_axis_object_', 'moco_axis_label_']:
-                thisProp = getattr(props, propName + str(self.index))
-                otherProp = getattr(props, propName + str(self.index - 1))
-                setattr(props, propName + str(self.index), otherProp)
-                setattr(props, propName+ str(self.index - 1), thisProp)
-            
-            swapAxisFCurves(self.index, self.index - 1)
-                
-            updatePositionInputs()
-            return {'FINISHED'}
-
-    # Move axis down button
-    class MoveAxisDown(Operator):
-        index = i
-        bl_idname = 'moco.moveaxisdown' + str(index)
-        bl_label = 'Move axis down'
-        
-        def execute(self, context):
-            global props, updatingAxisSlots
-            updatingAxisPositions = True
-            
-            for propName in ['moco_axis_component_', 'moco_axis_object_', 'moco_axis_label_']:
-                thisProp = getattr(props, propName + str(self.index))
-                otherProp = getattr(props, propName + str(self.index + 1))
-                setattr(props, propName + str(self.index), otherProp)
-                setattr(props, propName+ str(self.index + 1), thisProp)
-                
-            swapAxisFCurves(self.index, self.index + 1)
+        if not (0 <= self.index < len(props.moco_axes)):
+            return {'CANCELLED'}
+        
+        entry = getAxisTable()[self.index]
+        position = getAxisInputPosition(self.index)
+        point = entry.axis.focuscalibration.add()
+        if not (position is None):
+            point.distance = getCurrentFocusDistance(entry)
+            point.position = position
+            
+        invalidateAxisTable()
+        return {'FINISHED'}
+    
+    
+# Remove a lens calibration point from a focus axis
+class RemoveFocusPoint(Operator):
+    bl_idname = 'moco.removefocuspoint'
+    bl_label = 'Remove lens calibration point'
+    
+    index: bpy.props.IntProperty()
+    point: bpy.props.IntProperty()
+    
+    def execute(self, context):
+        global props
+        
+        if not (0 <= self.index < len(props.moco_axes)):
+            return {'CANCELLED'}
+        
+        calibration = props.moco_axes[self.index].focuscalibration
+        if not (0 <= self.point < len(calibration)):
+            return {'CANCELLED'}
+        
+        calibration.remove(self.point)
+        invalidateAxisTable()
+        return {'FINISHED'}
+    
+    
+# Move axis up button
+class MoveAxisUp(Operator):
+    bl_idname = 'moco.moveaxisup'
+    bl_label = 'Move axis up'
+    
+    index: bpy.props.IntProperty()
+    
+    def execute(self, context):
+        global props
+        
+        if not (0 < self.index < len(props.moco_axes)):
+            return {'CANCELLED'}
+        
+        props.moco_axes.move(self.index, self.index - 1)
+        remapAxisFCurves({self.index: self.index - 1, self.index - 1: self.index})
+        props.moco_axis_index = self.index - 1
             
-            updatePositionInputs()
-            return {'FINISHED'}
+        invalidateAxisTable()
+        updatePositionInputs()
+        return {'FINISHED'}
+
+
+# Move axis down button
+class MoveAxisDown(Operator):
+    bl_idname = 'moco.moveaxisdown'
+    bl_label = 'Move axis down'
+    
+    index: bpy.props.IntProperty()
+    
+    def execute(self, context):
+        global props
+        
+        if not (0 <= self.index < len(props.moco_axes) - 1):
+            return {'CANCELLED'}
         
-    removeOperators.append(RemoveAxis)
-    moveUpOperators.append(MoveAxisUp)
-    moveDownOperators.append(MoveAxisDown)
+        props.moco_axes.move(self.index, self.index + 1)
+        remapAxisFCurves({self.index: self.index + 1, self.index + 1: self.index})
+        props.moco_axis_index = self.index + 1
+        
+        invalidateAxisTable()
+        updatePositionInputs()
+        return {'FINISHED'}
     
     
+# Write an axis input position to its object channel and remember it, so playback can skip unchanged axes
+def writeAxisPosition(entry, position):
+    if entry.isRotation:
+        entry.object.rotation_euler[entry.component - 3] = position
+    else:
+        entry.object.location[entry.component] = position
+    entry.lastPosition = position
+    
     
 # When position input has been changed in axis panel, update object positions
 def updateObjectPositions():
-    global maxAxisCount, props, updatingAxisPositions
+    global props, updatingAxisPositions
     
     if updatingAxisPositions:
         return
     
-    if not ("moco_num_axis" in props):
-        return
-    
-    for i in range(props.moco_num_axis):
-        object = getAxisObject(i)
-
-        if not (object is None):
-            component = getAxisComponent(i)
-            position = getAxisInputPosition(i)
-            
-            if component == 0 or component == 1 or component == 2:
-                object.location[component] = position
-            elif component == 3 or component == 4 or component == 5:
-                object.rotation_euler[component - 3] = position
+    for entry in getAxisTable():
+        if not (entry.object is None or entry.readsTransform):
+            writeAxisPosition(entry, entry.getInput())
                 
 
 
 # Update position inputs to reflect actual model position values
 def updatePositionInputs():
-    global maxAxisCount, props, updatingAxisPositions
+    global props, updatingAxisPositions
     
     updatingAxisPositions = True
     
-    for i in range(props.moco_num_axis):
-        object = getAxisObject(i)
-
-        if not (object is None):
-            component = getAxisComponent(i)
-            position = getAxisObjectPosition(i)
-            
-            if component == 0 or component == 1 or component == 2:
-                setattr(props, "moco_axis_setlength_" + str(i), position)
-            elif component == 3 or component == 4 or component == 5:
-                setattr(props, "moco_axis_setrot_" + str(i), position)
+    for entry in getAxisTable():
+        if not (entry.object is None or entry.readsTransform):
+            position = getAxisObjectPosition(entry.index)
+            entry.setInput(position)
+            entry.lastPosition = position
                 
     updatingAxisPositions = False
 
 
-# Update object positions to reflect keyframed position inputs during animation playback
-def animationUpdate(scene):
+# Frame change handler. With moco_profile on, the time of each update is recorded for the panel histogram, except
+# for frames set while sampling for export or bake.
+@persistent
+def animationUpdate(scene, depsgraph = None):
+    if not scene.moco_profile or samplingFrames or exportingCameraMovement:
+        updateAnimatedObjects(scene, depsgraph)
+        return
+    
+    startTime = time.perf_counter()
+    updateAnimatedObjects(scene, depsgraph)
+    handlerTimes.append(time.perf_counter() - startTime)
+    
+    
+# Update object positions to reflect keyframed position inputs during animation playback.
+# Only axes with animated inputs are considered, only objects whose input value changed since it was last
+# written are touched, and the view layer is updated once, only if something moved. The depsgraph passed
+# to the handler is used when there is one, so this also works while rendering and under blender -b.
+def updateAnimatedObjects(scene, depsgraph):
     global props
     props = scene
-    updateObjectPositions()
-    bpy.context.view_layer.update()
+    
+    if updatingAxisPositions:
+        return
+    
+    animationData = props.animation_data
+    if animationData is None:
+        return
+    
+    animatedPaths = getFCurveIndex()
+    if len(animationData.drivers) > 0:
+        animatedPaths = set(animatedPaths).union(driver.data_path for driver in animationData.drivers)
+    useNLA = animationData.use_nla and len(animationData.nla_tracks) > 0
+    
+    changed = False
+    for entry in getAxisTable():
+        if entry.object is None or entry.readsTransform or not (useNLA or entry.inputProperty in animatedPaths):
+            continue
+        
+        position = entry.getInput()
+        if position != entry.lastPosition:
+            writeAxisPosition(entry, position)
+            changed = True
+            
+    if changed:
+        viewLayer = bpy.context.view_layer if depsgraph is None else depsgraph.view_layer
+        viewLayer.update()
 
 
-#Class for the panel with input UI
-class View3dPanel(Panel):
-    bl_idname = "OBJECT_PT_moco_export"
-    bl_space_type = 'VIEW_3D'
-    bl_region_type = 'UI'
-    bl_label = 'MoCo Export'
-    bl_context = 'objectmode'
-    bl_category = 'MoCo Export'
+# Live streaming
+# While streaming is on, the position of every axis is sent on each frame change, in exported units, as a binary
+# packet to a UDP or TCP endpoint. Packets are handed to a background thread through a short queue, so the UI
+# thread never waits on the network. When the network falls behind, only the latest queued packet is sent.
+# A packet is a little endian header of magic b'MOCO', version, number of axes, sequence number, frame and the
+# time.time() at which the frame was evaluated, followed by one float32 position per axis. MoCoStreamReceiver.py
+# reads the same format.
+streamPacketHeader = struct.Struct('<4sHHIdd')
+streamPacketMagic = b'MOCO'
+streamPacketVersion = 1
+streamQueueLength = 8
+streamReconnectInterval = 0.5
+
+axisStream = None
+
+
+class AxisStream:
+    def __init__(self, protocol, host, port):
+        self.protocol = protocol
+        self.address = (host, port)
+        self.queue = collections.deque(maxlen = streamQueueLength)
+        self.condition = threading.Condition()
+        self.running = True
+        self.sequence = 0
+        self.sent = 0
+        self.error = None
+        self.thread = threading.Thread(target = self.run, name = 'MoCoAxisStream', daemon = True)
+        self.thread.start()
+        
+    # Queue the positions of a frame. Called from the frame change handler, never blocks on the network.
+    def send(self, frame, positions):
+        packet = streamPacketHeader.pack(streamPacketMagic, streamPacketVersion, len(positions), self.sequence & 0xFFFFFFFF, frame, time.time())
+        packet += np.asarray(positions, dtype = '<f4').tobytes()
+        self.sequence += 1
+        with self.condition:
+            self.queue.append(packet)
+            self.condition.notify()
+            
+    # Packets that were queued but replaced by a later one before they could be sent
+    def getDropped(self):
+        return self.sequence - self.sent - len(self.queue)
+            
+    # Signal the sender thread to stop. It closes its connection and exits on its own, after a send or connection
+    # attempt that is in progress, so the UI thread never waits for it.
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        
+    def connect(self):
+        if self.protocol == '0':
+            return socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        connection = socket.create_connection(self.address, timeout = 1)
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return connection
+        
+    # Sender thread
+    def run(self):
+        connection = None
+        while True:
+            with self.condition:
+                while self.running and len(self.queue) == 0:
+                    self.condition.wait()
+                if not self.running:
+                    break
+                packet = self.queue[-1]
+                self.queue.clear()
+                
+            try:
+                if connection is None:
+                    connection = self.connect()
+                if self.protocol == '0':
+                    connection.sendto(packet, self.address)
+                else:
+                    connection.sendall(packet)
+                self.sent += 1
+                self.error = None
+            except OSError as e:
+                self.error = str(e)
+                if not (connection is None):
+                    connection.close()
+                    connection = None
+                with self.condition:
+                    self.condition.wait_for(lambda: not self.running, timeout = streamReconnectInterval)
+                
+        if not (connection is None):
+            connection.close()
+            
+            
+def stopAxisStream():
+    global axisStream
+    if not (axisStream is None):
+        axisStream.stop()
+        axisStream = None
+        
+        
+# Restart the stream when its settings change
+def updateAxisStream(self, context):
+    stopAxisStream()
+    
+
+# Send the current axis positions after animationUpdate has moved the objects. The stream is started on the first
+# frame change with streaming on. Frames set while sampling for export or bake are not sent.
+@persistent
+def streamAxisPositions(scene, depsgraph = None):
+    global props, axisStream
     
-    global maxAxisCount, setAxisLength, setAxisRotation
+    if not scene.moco_stream_enabled or samplingFrames or exportingCameraMovement:
+        return
+    props = scene
     
-    # Custom parameters for moco pos, filepath, num axis in use
-    bpy.types.Scene.camera_path_file_name = bpy.props.StringProperty(name="Filename", description = "Filename for Dragonframe raw move file. Will be exported to Blender file directory.", default = "CameraMovement")
+    if axisStream is None:
+        axisStream = AxisStream(scene.moco_stream_protocol, scene.moco_stream_host, scene.moco_stream_port)
+        
+    positions = []
+    for entry in getAxisTable():
+        position = getAxisInputPosition(entry.index)
+        if position is None:
+            position = 0
+        positions.append(math.degrees(position) if entry.isRotation else position)
+    axisStream.send(scene.frame_current_final, positions)
     
-    bpy.types.Scene.moco_export_type = bpy.props.EnumProperty(items = (('0', 'Raw Move', ''), ('1', 'Arc Move', '')), name ="File Type", description = "Type of file to export. Raw Move exports axis positions for each frame, Arc Move exports raw keyframe curves. Arc Move can be edited in Dragonframe, but require axis setup after import. For Arc Move, there be slight discrepancies between how Blender and Dragonframe interpolate between keyframes.")
+
+@persistent
+def stopAxisStreamHandler(*args):
+    stopAxisStream()
+    
+
+# moco_stream_enabled is saved with the file, but streaming is only turned on by hand. Opening a file turns it off, so
+# a file saved while streaming doesn't start moving a rig when it's opened.
+@persistent
+def resetAxisStreamHandler(*args):
+    for scene in bpy.data.scenes:
+        if scene.moco_stream_enabled:
+            scene.moco_stream_enabled = False
     
-    bpy.types.Scene.moco_num_axis = bpy.props.IntProperty()
     
-    # Custom parameters for each axis slot: component, object string, position
-    axisCompnentItems = (('0', 'LX', 'X Location'), ('1', 'LY', 'Y Location'), ('2', 'LZ', 'Z Location'), ('3', 'RX', 'X Rotation'), ('4', 'RY', 'Y Rotation'), ('5', 'RZ', 'Z Rotation'))
+# Migration of files saved before axes were stored in the moco_axes collection. Those files keep the old
+# moco_num_axis and moco_axis_<property>_<index> scene properties as ID properties, which are copied into
+# moco_axes, and their F-curves are renamed to the new data paths.
+legacyAxisProperties = ['label', 'component', 'object', 'setlength', 'setrot']
+legacyPathPattern = re.compile(r'^moco_axis_(setlength|setrot)_(\d+)$')
 
+def migrateLegacyAxes(scene):
+    global updatingAxisPositions
+    
+    numLegacyAxes = scene.get('moco_num_axis')
+    if numLegacyAxes is None:
+        return False
+    
+    updatingAxisPositions = True
+    
+    if len(scene.moco_axes) == 0:
+        for i in range(numLegacyAxes):
+            axis = scene.moco_axes.add()
+            axis.label = scene.get('moco_axis_label_' + str(i), "")
+            axis.component = str(scene.get('moco_axis_component_' + str(i), i % 6))
+            axis.object = scene.get('moco_axis_object_' + str(i), "")
+            axis.setlength = scene.get('moco_axis_setlength_' + str(i), 0.0)
+            axis.setrot = scene.get('moco_axis_setrot_' + str(i), 0.0)
+            
+        # Curves of axes at or past moco_num_axis were left behind by removed axes, and are deleted rather than
+        # moved onto axes that would bring them back when added
+        if not (scene.animation_data is None) and not (scene.animation_data.action is None):
+            fcurves = scene.animation_data.action.fcurves
+            staleFCurves = []
+            for fcurve in fcurves:
+                match = legacyPathPattern.match(fcurve.data_path)
+                if match is None:
+                    continue
+                if int(match.group(2)) >= numLegacyAxes:
+                    staleFCurves.append(fcurve)
+                else:
+                    fcurve.data_path = getAxisPropertyPath(int(match.group(2)), match.group(1))
+            for fcurve in staleFCurves:
+                fcurves.remove(fcurve)
+    
+    for key in list(scene.keys()):
+        if key == 'moco_num_axis' or any(key.startswith('moco_axis_' + name + '_') for name in legacyAxisProperties):
+            del scene[key]
+    
+    updatingAxisPositions = False
+    return True
 
-    def update(self, context):
-        updateObjectPositions()
 
-    for i in range(maxAxisCount):
-        label = bpy.props.StringProperty(name = "Axis " + str(i), description = "Label for user reference. Also included in .arcm XML exports.")
-        componentProp = bpy.props.EnumProperty(items = axisCompnentItems, name ="Component", description = "Relevent component of movement.", default = str(i % 6))
-        objectProp = bpy.props.StringProperty(name ="Object", description = "Object that represents relevent motion.")
-        setAxisLengthProp = bpy.props.FloatProperty(name="Pos " + str(i), description = "Set axis position. Animate this value, not the object directly.", unit = 'LENGTH', update = update)
-        setAxisRotProp = bpy.props.FloatProperty(name="Pos " + str(i), description = "Set axis position. Animate this value, not the object directly.", unit = 'ROTATION', update = update)
+@persistent
+def migrateLegacyAxesHandler(*args):
+    migrated = False
+    for scene in bpy.data.scenes:
+        migrated = migrateLegacyAxes(scene) or migrated
+    if migrated:
+        invalidateAxisTable()
+        invalidateFCurveIndex()
         
-        setattr(bpy.types.Scene, "moco_axis_label_" + str(i), label)
-        setattr(bpy.types.Scene, "moco_axis_component_" + str(i), componentProp)
-        setattr(bpy.types.Scene, "moco_axis_object_" + str(i), objectProp)
-        setattr(bpy.types.Scene, "moco_axis_setlength_" + str(i), setAxisLengthProp)
-        setattr(bpy.types.Scene, "moco_axis_setrot_" + str(i), setAxisRotProp)
+
+# Axis properties
+# Custom parameters for each axis: label, component, object string, position
+axisSpaceItems = (('0', 'Axis Input', 'Animate the axis position in this panel. It drives the local location or rotation of the object.'), ('1', 'World', 'Read the axis position from the world transform of the object, including parents, constraints and drivers. Animate the object directly.'), ('2', 'Relative', 'Read the axis position from the world transform of the object relative to a reference object. Animate the object directly.'))
+axisComponentItems = (('0', 'LX', 'X Location'), ('1', 'LY', 'Y Location'), ('2', 'LZ', 'Z Location'), ('3', 'RX', 'X Rotation'), ('4', 'RY', 'Y Rotation'), ('5', 'RZ', 'Z Rotation'), ('6', 'F', 'Focus, from the distance between the object and the focus target'))
+
+def updateAxisPosition(self, context):
+    global props
+    props = context.scene
+    updateObjectPositions()
+    
+def updateAxisSetup(self, context):
+    invalidateAxisTable()
+    
+
+# One point of a focus axis lens calibration: the motor position that focuses at a distance
+class MocoFocusPoint(PropertyGroup):
+    distance: bpy.props.FloatProperty(name = "Distance", description = "Focus distance from the camera object to the target.", unit = 'LENGTH', min = 0, update = updateAxisSetup)
+    position: bpy.props.FloatProperty(name = "Position", description = "Focus motor position in Dragonframe for this distance.", update = updateAxisSetup)
+    
+
+class MocoAxis(PropertyGroup):
+    label: bpy.props.StringProperty(name = "Label", description = "Label for user reference. Also included in .arcm XML exports.", update = updateAxisSetup)
+    component: bpy.props.EnumProperty(items = axisComponentItems, name ="Component", description = "Relevent component of movement.", update = updateAxisSetup)
+    object: bpy.props.StringProperty(name ="Object", description = "Object that represents relevent motion.", update = updateAxisSetup)
+    space: bpy.props.EnumProperty(items = axisSpaceItems, name = "Space", description = "Where the axis position comes from.", update = updateAxisSetup)
+    reference: bpy.props.StringProperty(name = "Reference", description = "Object that relative axis positions are measured from, or the focus target of focus axes. World origin if empty.", update = updateAxisSetup)
+    focuscalibration: bpy.props.CollectionProperty(type = MocoFocusPoint, name = "Lens Calibration", description = "Focus motor positions for focus distances, interpolated between points.")
+    setlength: bpy.props.FloatProperty(name="Pos", description = "Set axis position. Animate this value, not the object directly.", unit = 'LENGTH', update = updateAxisPosition)
+    setrot: bpy.props.FloatProperty(name="Pos", description = "Set axis position. Animate this value, not the object directly.", unit = 'ROTATION', update = updateAxisPosition)
+    maxvelocity: bpy.props.FloatProperty(name = "Max Velocity", description = "Highest speed of the axis per second, in exported units (scene length units or degrees). 0 for no limit.", default = 0, min = 0)
+    maxacceleration: bpy.props.FloatProperty(name = "Max Acceleration", description = "Highest acceleration of the axis per second squared, in exported units. 0 for no limit.", default = 0, min = 0)
+    maxjerk: bpy.props.FloatProperty(name = "Max Jerk", description = "Highest jerk of the axis per second cubed, in exported units. 0 for no limit.", default = 0, min = 0)
+    
+    
+# Axis list rows: label and live position of each axis
+class MOCO_UL_axes(UIList):
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        axes = getAxisTable()
+        if index >= len(axes):
+            return
+        entry = axes[index]
         
+        row = layout.row(align = True)
+        row.prop(item, 'label', text = '', emboss = False, icon = 'IPO_CONSTANT')
+        if entry.object is None:
+            row.label(text = "No object", icon = 'ERROR')
+        elif entry.readsTransform:
+            position = getCurrentTransformPosition(entry)
+            row.label(text = "%.2f" % (math.degrees(position) if entry.isRotation else position), icon = 'CAMERA_DATA' if entry.isFocus else 'WORLD' if entry.reference is None else 'ORIENTATION_PARENT')
+        else:
+            row.prop(item, entry.inputAttribute, text = '')
+            
+            
+# While animation plays, the MoCo Export sidebars are redrawn on a fixed cadence instead of on every frame
+playbackRedrawInterval = 0.1
+idleRedrawInterval = 0.5
+
+def redrawPanelDuringPlayback():
+    windowManager = bpy.context.window_manager
+    if windowManager is None:
+        return idleRedrawInterval
+    
+    playing = False
+    for window in windowManager.windows:
+        screen = window.screen
+        if screen is None or not screen.is_animation_playing:
+            continue
+        playing = True
+        for area in screen.areas:
+            if area.type == 'VIEW_3D':
+                for region in area.regions:
+                    if region.type == 'UI':
+                        region.tag_redraw()
+                        
+    return playbackRedrawInterval if playing else idleRedrawInterval
+
+
+#Class for the panel with input UI
+class View3dPanel(Panel):
+    bl_idname = "OBJECT_PT_moco_export"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_label = 'MoCo Export'
+    bl_context = 'objectmode'
+    bl_category = 'MoCo Export'
     
 
     # Add UI elements here
     # draw method executed every time anything changes.
     def draw(self, context): 
-        global maxAxisCount, props, exportingCameraMovement
+        global props, exportingCameraMovement
         
         layout = self.layout
         scene = context.scene
@@ -459,49 +2437,63 @@ class View3dPanel(Panel):
     
     
         layout.label(text = "Axis Definitions", icon = 'PARTICLES')
+        
+        # Axis list. Only the visible rows are laid out, using the cached axis table.
+        axes = getAxisTable()
         row = layout.row()
-        row.operator('moco.addmovementaxis', text = 'Add New MoCo Axis', icon = 'ADD')
+        row.template_list('MOCO_UL_axes', "", scene, "moco_axes", scene, "moco_axis_index", rows = 5)
         
-        # All the axis slots
-        for i in range(props.moco_num_axis):
+        col = row.column(align = True)
+        col.operator('moco.addmovementaxis', text = '', icon = 'ADD')
+        sub = col.column(align = True)
+        sub.operator('moco.removemovementaxis', text = '', icon = 'REMOVE').index = scene.moco_axis_index
+        sub.enabled = len(axes) > 0
+        col.separator()
+        sub = col.column(align = True)
+        sub.operator('moco.moveaxisup', text = '', icon = 'TRIA_UP').index = scene.moco_axis_index
+        sub.enabled = scene.moco_axis_index > 0
+        sub = col.column(align = True)
+        sub.operator('moco.moveaxisdown', text = '', icon = 'TRIA_DOWN').index = scene.moco_axis_index
+        sub.enabled = scene.moco_axis_index < len(axes) - 1
+        
+        row = layout.row()
+        row.operator('moco.bakeaxes', text = 'Bake Object Animation', icon = 'ACTION')
+        row.enabled = len(axes) > 0
+        
+        # Settings of the selected axis. Searching the scene objects is skipped while playing.
+        if 0 <= scene.moco_axis_index < len(axes):
+            entry = axes[scene.moco_axis_index]
             box = layout.box()
-            
+            box.prop(entry.axis, 'label', text = "Axis " + str(entry.index), icon = 'IPO_CONSTANT')
             row = box.row()
-            row.prop(props, 'moco_axis_label_' + str(i), icon = 'IPO_CONSTANT')
-            
-            mainSplit = box.split()
-            
-            # Left upper side: axis label and position input
-            mainLeft = mainSplit.column()
-            leftSplit = mainLeft.split()
-            row = leftSplit.row()
-            #row.label(text = str(i) , icon = 'IPO_CONSTANT')
-            
-            object = getAxisObject(i)
-            if not (object is None):
-                component = getAxisComponent(i)
-                if component == 0 or component == 1 or component == 2:
-                    row.prop(props, 'moco_axis_setlength_' + str(i))
-                elif component == 3 or component == 4 or component == 5:
-                    row.prop(props, 'moco_axis_setrot_' + str(i))
-                    
-                    
-             # Right upper side: move up, move down, delete buttons
-            mainRight = mainSplit.column()
-            rightSplit = mainRight.split()
-            col = rightSplit.column()
-            col.operator('moco.moveaxisup' + str(i), text = 'Up', icon = 'TRIA_UP')
-            col.enabled = i > 0
-            col = rightSplit.column()
-            col.operator('moco.moveaxisdown' + str(i), text = 'Down', icon = 'TRIA_DOWN')
-            col.enabled = i < props.moco_num_axis - 1
-            col = rightSplit.column()
-            col.operator('moco.removemovementaxis' + str(i), text = 'Remove', icon = 'CANCEL')
-            
-            # Lower side: object and component
-            row = box.row()
-            row.prop_search(props, "moco_axis_object_" + str(i), scene, "objects")
-            row.prop(props, "moco_axis_component_" + str(i))
+            if context.screen is not None and context.screen.is_animation_playing:
+                row.label(text = entry.axis.object, icon = 'OBJECT_DATA')
+            else:
+                row.prop_search(entry.axis, "object", scene, "objects")
+            row.prop(entry.axis, "component")
+            if entry.isFocus:
+                row = box.row()
+                row.prop_search(entry.axis, "reference", scene, "objects", text = "Focus Target")
+                
+                col = box.column(align = True)
+                col.label(text = "Lens Calibration")
+                for pointIndex, point in enumerate(entry.axis.focuscalibration):
+                    row = col.row(align = True)
+                    row.prop(point, "distance")
+                    row.prop(point, "position")
+                    op = row.operator('moco.removefocuspoint', text = '', icon = 'X')
+                    op.index = entry.index
+                    op.point = pointIndex
+                col.operator('moco.addfocuspoint', text = 'Add Calibration Point', icon = 'ADD').index = entry.index
+            else:
+                row = box.row()
+                row.prop(entry.axis, "space")
+                if entry.space == 2:
+                    row.prop_search(entry.axis, "reference", scene, "objects")
+            col = box.column(align = True)
+            col.prop(entry.axis, "maxvelocity")
+            col.prop(entry.axis, "maxacceleration")
+            col.prop(entry.axis, "maxjerk")
      
      
         # Camera export filepath and button
@@ -514,43 +2506,236 @@ class View3dPanel(Panel):
         row.prop(props, "camera_path_file_name")
         row = layout.row()
         row.prop(props, "moco_export_type")
+        if props.moco_export_type == '0':
+            row = layout.row()
+            row.prop(props, "moco_raw_sampling")
+            row = layout.row(align = True)
+            row.prop(props, "moco_use_sample_rate", text = "", icon = 'TIME')
+            if props.moco_use_sample_rate:
+                row.prop(props, "moco_sample_rate")
+            else:
+                row.prop(props, "moco_samples_per_frame")
+            row = layout.row(align = True)
+            row.prop(props, "moco_sample_cache")
+            row.operator('moco.clearsamplecache', text = '', icon = 'TRASH')
+            if props.moco_sample_cache != '0':
+                row = layout.row()
+                row.prop(props, "moco_sample_cache_size")
+            col = layout.column(align = True)
+            col.label(text = "Decimals")
+            row = col.row(align = True)
+            row.prop(props, "moco_raw_precision_length", text = "Location")
+            row.prop(props, "moco_raw_precision_rotation", text = "Rotation")
+            row.prop(props, "moco_raw_precision_focus", text = "Focus")
+        elif props.moco_export_type == '1':
+            row = layout.row()
+            row.prop(props, "moco_arc_reduce")
+            if props.moco_arc_reduce or any(entry.readsTransform for entry in axes):
+                col = layout.column(align = True)
+                col.prop(props, "moco_arc_tolerance_length")
+                col.prop(props, "moco_arc_tolerance_rotation")
+                col.prop(props, "moco_arc_tolerance_focus")
+        row = layout.row()
+        row.prop(props, "moco_limit_check")
         row = layout.row()
         row.scale_y = 2.0
         
         row.operator('moco.exportmovement', text = 'Export Movement', icon = 'CAMERA_DATA')
         row.enabled = not exportingCameraMovement
+        
+        # Profiling settings, the stages of the last export and the frame handler histogram
+        row = layout.row(align = True)
+        row.prop(props, "moco_profile", icon = 'TIME')
+        row.prop(props, "moco_profile_sidecar", text = "", icon = 'FILE_TEXT')
+        row.operator('moco.resetprofile', text = '', icon = 'TRASH')
+        if props.moco_profile:
+            col = layout.column(align = True)
+            if not (profileSummary is None):
+                col.label(text = "Last export " + "%.3f" % profileSummary['seconds'] + "s")
+                for name, stats in profileSummary['stages'].items():
+                    col.label(text = "    " + name + " " + "%.3f" % stats['seconds'] + "s" + ("" if stats['calls'] == 1 else " x" + str(stats['calls'])))
+            handlerStats = getHandlerStats()
+            if not (handlerStats is None):
+                col.label(text = "Frame handler ms: mean " + "%.3f" % handlerStats['meanMs'] + ", p95 " + "%.3f" % handlerStats['p95Ms'] + ", max " + "%.3f" % handlerStats['maxMs'])
+                maxCount = max(handlerStats['histogram'])
+                for label, count in zip(getHandlerHistogramLabels(), handlerStats['histogram']):
+                    if count > 0:
+                        row = col.row()
+                        row.label(text = label)
+                        row.label(text = "|" * max(1, int(round(20 * count / maxCount))) + " " + str(count))
+        
+        # Live stream settings and status
+        layout.separator()
+        layout.label(text = "Live stream", icon = 'LINKED')
+        row = layout.row(align = True)
+        row.prop(props, "moco_stream_enabled", text = "", icon = 'PLAY' if not props.moco_stream_enabled else 'PAUSE')
+        row.prop(props, "moco_stream_protocol", text = "")
+        row.prop(props, "moco_stream_host", text = "")
+        row.prop(props, "moco_stream_port", text = "")
+        if props.moco_stream_enabled and not (axisStream is None):
+            if axisStream.error is None:
+                layout.label(text = "Sent " + str(axisStream.sent) + ", dropped " + str(axisStream.getDropped()))
+            else:
+                layout.label(text = axisStream.error, icon = 'ERROR')
+        
+        # Import buttons
+        layout.separator()
+        layout.label(text = "File import", icon = 'IMPORT')
+        row = layout.row(align = True)
+        row.operator('moco.importrawmove', text = 'Raw Move')
+        row.operator('moco.importarcmove', text = 'Arc Move')
     
     
 # Register
+classes = [MocoFocusPoint, MocoAxis, MOCO_UL_axes, View3dPanel, ExportMovement, AddAxis, RemoveAxis, MoveAxisUp, MoveAxisDown, AddFocusPoint, RemoveFocusPoint, ClearSampleCache, ImportRawMove, ImportArcMove, BakeAxes, ResetProfile]
+
 def register():
-    bpy.utils.register_class(View3dPanel)
-    bpy.utils.register_class(ExportMovement)
-    bpy.utils.register_class(AddAxis)
+    for cls in classes:
+        bpy.utils.register_class(cls)
+    
+    # Custom parameters for moco axes, filepath and export settings
+    bpy.types.Scene.moco_axes = bpy.props.CollectionProperty(type = MocoAxis)
+    
+    bpy.types.Scene.moco_axis_index = bpy.props.IntProperty(name = "Active Axis", default = 0, min = 0)
+    
+    bpy.types.Scene.camera_path_file_name = bpy.props.StringProperty(name="Filename", description = "Filename for Dragonframe raw move file. Will be exported to Blender file directory.", default = "CameraMovement")
+    
+    bpy.types.Scene.moco_export_type = bpy.props.EnumProperty(items = (('0', 'Raw Move', ''), ('1', 'Arc Move', '')), name ="File Type", description = "Type of file to export. Raw Move exports axis positions for each frame, Arc Move exports raw keyframe curves. Arc Move can be edited in Dragonframe, but require axis setup after import. For Arc Move, there be slight discrepancies between how Blender and Dragonframe interpolate between keyframes.")
+    
+    bpy.types.Scene.moco_raw_sampling = bpy.props.EnumProperty(items = (('0', 'F-Curve', ''), ('1', 'Playback', '')), name ="Sampling", description = "How Raw Move positions are read. F-Curve evaluates the axis curves directly for every frame and is much faster. Playback steps through the timeline, and is used automatically when an axis is driven by drivers or NLA strips.")
+    
+    bpy.types.Scene.moco_samples_per_frame = bpy.props.IntProperty(name = "Samples Per Frame", description = "Number of Raw Move rows exported for each frame. Samples between frames are evaluated at subframe times.", default = 1, min = 1, soft_max = 100)
+    
+    bpy.types.Scene.moco_use_sample_rate = bpy.props.BoolProperty(name = "Use Sample Rate", description = "Export Raw Move samples at a fixed rate in Hz instead of a number of samples per frame.", default = False)
+    
+    bpy.types.Scene.moco_sample_rate = bpy.props.FloatProperty(name = "Sample Rate (Hz)", description = "Raw Move samples per second of scene time, using the scene frame rate.", default = 100, min = 0.001, soft_max = 1000)
+    
+    bpy.types.Scene.moco_sample_cache = bpy.props.EnumProperty(items = (('0', 'Off', 'Evaluate every axis on every export'), ('1', 'Memory', 'Keep sampled axes in memory for this Blender session'), ('2', 'Disk', 'Also keep sampled axes in a moco_cache folder next to the Blender file')), name = "Sample Cache", description = "Reuse sampled positions of axes that haven't changed since the last export.", default = '1')
+    
+    bpy.types.Scene.moco_sample_cache_size = bpy.props.IntProperty(name = "Cache Size (MB)", description = "Size limit of the sample cache, in memory and on disk. Least recently used axes are evicted first.", default = 256, min = 1)
+    
+    bpy.types.Scene.moco_raw_precision_length = bpy.props.IntProperty(name = "Location Decimals", description = "Decimal places of location axes in Raw Move files.", default = 6, min = 0, max = 12)
+    
+    bpy.types.Scene.moco_raw_precision_rotation = bpy.props.IntProperty(name = "Rotation Decimals", description = "Decimal places of rotation axes, in degrees, in Raw Move files.", default = 6, min = 0, max = 12)
+    
+    bpy.types.Scene.moco_raw_precision_focus = bpy.props.IntProperty(name = "Focus Decimals", description = "Decimal places of focus axes in Raw Move files.", default = 6, min = 0, max = 12)
+    
+    bpy.types.Scene.moco_arc_reduce = bpy.props.BoolProperty(name = "Reduce Keyframes", description = "Refit axes with dense keyframes, like baked or imported motion, with as few keyframes as possible while staying within the tolerance of the motion Blender plays back. Hand keyed axes are exported as they are.", default = False)
+    
+    bpy.types.Scene.moco_arc_tolerance_length = bpy.props.FloatProperty(name = "Location Tolerance", description = "Maximum deviation of reduced location axes.", default = 0.001, min = 0, unit = 'LENGTH', precision = 4)
+    
+    bpy.types.Scene.moco_arc_tolerance_rotation = bpy.props.FloatProperty(name = "Rotation Tolerance", description = "Maximum deviation of reduced rotation axes.", default = math.radians(0.01), min = 0, unit = 'ROTATION', precision = 4)
 
+    bpy.types.Scene.moco_arc_tolerance_focus = bpy.props.FloatProperty(name = "Focus Tolerance", description = "Maximum deviation of focus axes, in focus motor units.", default = 0.01, min = 0, precision = 4)
+    
+    bpy.types.Scene.moco_limit_check = bpy.props.EnumProperty(items = (('0', 'Off', 'Don\'t check axis limits'), ('1', 'Report', 'Report axes that exceed their limits and export anyway'), ('2', 'Stop', 'Don\'t export moves that exceed an axis limit')), name = "Limit Check", description = "Check the velocity, acceleration and jerk of every axis against its limits before export.", default = '1')
+    
+    bpy.types.Scene.moco_stream_enabled = bpy.props.BoolProperty(name = "Stream", description = "Send the position of every axis to a motion controller on each frame change.", default = False, update = updateAxisStream)
+    
+    bpy.types.Scene.moco_stream_protocol = bpy.props.EnumProperty(items = (('0', 'UDP', 'Send each frame as a datagram'), ('1', 'TCP', 'Send frames over a TCP connection')), name = "Protocol", description = "Network protocol of the live stream.", update = updateAxisStream)
+    
+    bpy.types.Scene.moco_stream_host = bpy.props.StringProperty(name = "Host", description = "Address of the motion controller.", default = "127.0.0.1", update = updateAxisStream)
+    
+    bpy.types.Scene.moco_stream_port = bpy.props.IntProperty(name = "Port", description = "Port of the motion controller.", default = 9000, min = 1, max = 65535, update = updateAxisStream)
+    
+    bpy.types.Scene.moco_profile = bpy.props.BoolProperty(name = "Profile", description = "Time each stage of exports and the frame change handler during playback, and show the results in this panel and the export report.", default = False, update = clearHandlerTimes)
+    
+    bpy.types.Scene.moco_profile_sidecar = bpy.props.BoolProperty(name = "Write Profile", description = "Write the export profile as a .profile.json file next to the exported files.", default = False)
+    
     bpy.app.handlers.frame_change_post.append(animationUpdate)
-        
-    for remove, up, down in zip(removeOperators, moveUpOperators, moveDownOperators):
-        bpy.utils.register_class(remove)
-        bpy.utils.register_class(up)
-        bpy.utils.register_class(down)
+    bpy.app.handlers.frame_change_post.append(streamAxisPositions)
+    bpy.app.handlers.load_post.append(migrateLegacyAxesHandler)
+    bpy.app.handlers.load_pre.append(stopAxisStreamHandler)
+    bpy.app.handlers.load_post.append(resetAxisStreamHandler)
+    
+    for handlers in [bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post]:
+        handlers.append(invalidateCachesHandler)
+    bpy.app.handlers.depsgraph_update_post.append(depsgraphUpdateHandler)
+    
+    # Migrate the file that is already open when the addon is enabled. bpy.data can't be modified during registration.
+    bpy.app.timers.register(migrateLegacyAxesHandler, first_interval = 0)
+    bpy.app.timers.register(resetAxisStreamHandler, first_interval = 0)
+    bpy.app.timers.register(redrawPanelDuringPlayback, first_interval = idleRedrawInterval, persistent = True)
         
     
 # Unregister
+sceneProperties = ['moco_axes', 'moco_axis_index', 'camera_path_file_name', 'moco_export_type', 'moco_raw_sampling', 'moco_samples_per_frame', 'moco_use_sample_rate', 'moco_sample_rate', 'moco_sample_cache', 'moco_sample_cache_size', 'moco_raw_precision_length', 'moco_raw_precision_rotation', 'moco_raw_precision_focus', 'moco_arc_reduce', 'moco_arc_tolerance_length', 'moco_arc_tolerance_rotation', 'moco_arc_tolerance_focus', 'moco_limit_check', 'moco_stream_enabled', 'moco_stream_protocol', 'moco_stream_host', 'moco_stream_port', 'moco_profile', 'moco_profile_sidecar']
+
 def unregister():
-    bpy.utils.unregister_class(View3dPanel)
-    bpy.utils.unregister_class(ExportMovement)
-    bpy.utils.unregister_class(AddAxis)
+    if bpy.app.timers.is_registered(redrawPanelDuringPlayback):
+        bpy.app.timers.unregister(redrawPanelDuringPlayback)
+    
+    stopAxisStream()
     
     bpy.app.handlers.frame_change_post.remove(animationUpdate)
+    bpy.app.handlers.frame_change_post.remove(streamAxisPositions)
+    bpy.app.handlers.load_post.remove(migrateLegacyAxesHandler)
+    bpy.app.handlers.load_pre.remove(stopAxisStreamHandler)
+    bpy.app.handlers.load_post.remove(resetAxisStreamHandler)
+    
+    for handlers in [bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post]:
+        handlers.remove(invalidateCachesHandler)
+    bpy.app.handlers.depsgraph_update_post.remove(depsgraphUpdateHandler)
+    
+    for name in sceneProperties:
+        delattr(bpy.types.Scene, name)
+    
+    for cls in reversed(classes):
+        bpy.utils.unregister_class(cls)
+        
     
-    for remove, up, down in zip(removeOperators, moveUpOperators, moveDownOperators):
-        bpy.utils.unregister_class(remove)
-        bpy.utils.unregister_class(up)
-        bpy.utils.unregister_class(down)
+    
+    
+# Headless export of a single scene, run by MoCoBatchExport.py as:
+# blender -b file.blend --python MoCoExportAddon.py -- --scene NAME --frames START END --type raw arc --suffix _NAME
+# Prints a result line for the batch exporter and returns the process exit code.
+batchResultPrefix = 'MOCO_BATCH_RESULT '
+
+def runBatchExport(argv):
+    parser = argparse.ArgumentParser(prog = 'MoCoExportAddon.py', description = "Export Raw Move and Arc Move files from the open Blender file.")
+    parser.add_argument('--scene', help = "Scene to export. Defaults to the active scene.")
+    parser.add_argument('--frames', nargs = 2, type = int, metavar = ('START', 'END'), help = "Frame range to export. Defaults to the scene frame range.")
+    parser.add_argument('--type', nargs = '+', choices = ['raw', 'arc'], default = ['raw'], help = "File types to export.")
+    parser.add_argument('--suffix', default = "", help = "Text added to the end of the export filename set in the panel.")
+    parser.add_argument('--list-outputs', action = 'store_true', help = "Report the export path of every scene, without its extension, instead of exporting.")
+    args = parser.parse_args(argv)
+    
+    result = {'file': bpy.data.filepath, 'scene': args.scene, 'files': [], 'error': None}
+    startTime = time.perf_counter()
+    
+    if args.list_outputs:
+        result['scene'] = bpy.context.scene.name
+        result['outputs'] = {scene.name: bpy.path.abspath("//" + scene.camera_path_file_name) for scene in bpy.data.scenes}
+        print(batchResultPrefix + json.dumps(result), flush = True)
+        return 0
+    
+    try:
+        migrateLegacyAxesHandler()
+        scene = bpy.context.scene if args.scene is None else bpy.data.scenes[args.scene]
+        result['scene'] = scene.name
+        if not (args.frames is None):
+            scene.frame_start, scene.frame_end = args.frames
+        scene.camera_path_file_name += args.suffix
+            
+        exportTypes = [{'raw': '0', 'arc': '1'}[exportType] for exportType in args.type]
+        result['files'], violations = exportSceneMovement(scene, exportTypes)
+        result['warnings'] = [getKinematicLimitsReport(scene, violations)] if violations else []
+        if scene.moco_profile:
+            result['profile'] = profileSummary
+        if violations and scene.moco_limit_check == '2':
+            result['error'] = "Kinematic limits exceeded, nothing was exported"
+    except Exception as e:
+        result['error'] = repr(e)
         
+    result['seconds'] = time.perf_counter() - startTime
+    print(batchResultPrefix + json.dumps(result), flush = True)
     
+    return 0 if result['error'] is None else 1
     
     
 # Needed to run script in Text Editor
 if __name__ == '__main__':
     register()
+    
+    if bpy.app.background and '--' in sys.argv:
+        sys.exit(runBatchExport(sys.argv[sys.argv.index('--') + 1:]))
@@ -0,0 +1,158 @@
+# Stand-in receiver for the live axis stream of MoCoExportAddon.py, for testing a stream without a motion controller.
+# Records every packet and prints the latency from frame evaluation in Blender to arrival, and the arrival jitter.
+# Latency is only meaningful when Blender and the receiver run on the same machine or have synchronized clocks.
+#
+# python MoCoStreamReceiver.py --protocol udp --port 9000
+# python MoCoStreamReceiver.py --protocol tcp --port 9000 --duration 60 --csv rehearsal.csv
+
+import sys
+import csv
+import json
+import time
+import struct
+import socket
+import argparse
+import statistics
+
+# Same packet format as the addon: header of magic, version, number of axes, sequence number, frame and send time,
+# followed by one float32 position per axis, little endian
+streamPacketHeader = struct.Struct('<4sHHIdd')
+streamPacketMagic = b'MOCO'
+
+
+# Split a packet into its header fields and axis positions
+def parsePacket(packet):
+    magic, version, numAxes, sequence, frame, sentTime = streamPacketHeader.unpack_from(packet)
+    if magic != streamPacketMagic:
+        raise ValueError("Not a MoCo stream packet")
+    positions = struct.unpack_from('<' + str(numAxes) + 'f', packet, streamPacketHeader.size)
+    return sequence, frame, sentTime, list(positions)
+
+
+# Read exactly size bytes from a TCP connection. Returns None when the connection is closed.
+def receiveExactly(connection, size):
+    data = b''
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+# Yield (packet, arrival time) pairs until the deadline or packet count is reached
+def receivePackets(protocol, host, port, deadline, maxPackets):
+    count = 0
+
+    if protocol == 'udp':
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind((host, port))
+    else:
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((host, port))
+        server.listen(1)
+    server.settimeout(0.2)
+
+    connection = None
+    try:
+        while (deadline is None or time.time() < deadline) and (maxPackets is None or count < maxPackets):
+            try:
+                if protocol == 'udp':
+                    packet = server.recv(65536)
+                else:
+                    if connection is None:
+                        connection, address = server.accept()
+                        connection.settimeout(0.2)
+                        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    header = receiveExactly(connection, streamPacketHeader.size)
+                    if header is None:
+                        connection.close()
+                        connection = None
+                        continue
+                    numAxes = streamPacketHeader.unpack(header)[2]
+                    payload = receiveExactly(connection, numAxes * 4)
+                    if payload is None:
+                        connection.close()
+                        connection = None
+                        continue
+                    packet = header + payload
+            except socket.timeout:
+                continue
+
+            yield packet, time.time()
+            count += 1
+    finally:
+        if not (connection is None):
+            connection.close()
+        server.close()
+
+
+# Latency, jitter and loss of the received packets. Jitter is the standard deviation of the time between arrivals.
+def getStreamStats(records):
+    stats = {'packets': len(records)}
+    if not records:
+        return stats
+
+    latencies = sorted((arrival - sentTime) * 1000 for sequence, frame, sentTime, arrival, positions in records)
+    intervals = [(records[index][3] - records[index - 1][3]) * 1000 for index in range(1, len(records))]
+    sequences = [record[0] for record in records]
+
+    stats['lost'] = sequences[-1] - sequences[0] + 1 - len(set(sequences))
+    stats['outOfOrder'] = sum(1 for index in range(1, len(sequences)) if sequences[index] < sequences[index - 1])
+    stats['latencyMeanMs'] = statistics.mean(latencies)
+    stats['latencyP50Ms'] = latencies[len(latencies) // 2]
+    stats['latencyP95Ms'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    stats['latencyMaxMs'] = latencies[-1]
+    if len(intervals) > 1:
+        stats['intervalMeanMs'] = statistics.mean(intervals)
+        stats['jitterMs'] = statistics.stdev(intervals)
+    return stats
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Receive the live axis stream of the MoCo Export addon and report latency and jitter.")
+    parser.add_argument('--protocol', choices = ['udp', 'tcp'], default = 'udp', help = "Protocol set in the addon panel.")
+    parser.add_argument('--host', default = '127.0.0.1', help = "Address to listen on.")
+    parser.add_argument('--port', type = int, default = 9000, help = "Port to listen on.")
+    parser.add_argument('--duration', type = float, default = None, help = "Seconds to record for. Records until interrupted by default.")
+    parser.add_argument('--count', type = int, default = None, help = "Stop after this many packets.")
+    parser.add_argument('--csv', default = None, help = "Write every packet to a CSV file: sequence, frame, latency and axis positions.")
+    parser.add_argument('--json', action = 'store_true', help = "Print the summary as JSON.")
+    parser.add_argument('--quiet', action = 'store_true', help = "Don't print each packet.")
+    args = parser.parse_args(argv)
+
+    deadline = None if args.duration is None else time.time() + args.duration
+    records = []
+
+    try:
+        for packet, arrival in receivePackets(args.protocol, args.host, args.port, deadline, args.count):
+            sequence, frame, sentTime, positions = parsePacket(packet)
+            records.append((sequence, frame, sentTime, arrival, positions))
+            if not args.quiet and not args.json:
+                print("%8d  frame %9.3f  %7.2f ms  " % (sequence, frame, (arrival - sentTime) * 1000) + "  ".join("%.4f" % position for position in positions))
+    except KeyboardInterrupt:
+        pass
+
+    if not (args.csv is None):
+        with open(args.csv, 'w', newline = '') as file:
+            writer = csv.writer(file)
+            writer.writerow(['sequence', 'frame', 'latency_ms'] + ['axis_' + str(index) for index in range(max([len(record[4]) for record in records] + [0]))])
+            for sequence, frame, sentTime, arrival, positions in records:
+                writer.writerow([sequence, frame, (arrival - sentTime) * 1000] + positions)
+
+    stats = getStreamStats(records)
+    if args.json:
+        print(json.dumps(stats, indent = 2))
+    else:
+        print(str(stats['packets']) + " packets" + ("" if not records else ", " + str(stats['lost']) + " lost, " + str(stats['outOfOrder']) + " out of order"))
+        if records:
+            print("Latency ms: mean %.3f, p50 %.3f, p95 %.3f, max %.3f" % (stats['latencyMeanMs'], stats['latencyP50Ms'], stats['latencyP95Ms'], stats['latencyMaxMs']))
+        if 'jitterMs' in stats:
+            print("Arrival interval ms: mean %.3f, jitter %.3f" % (stats['intervalMeanMs'], stats['jitterMs']))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
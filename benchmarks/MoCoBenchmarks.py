@@ -0,0 +1,275 @@
+# Benchmarks of the export, import and playback hot paths of MoCoExportAddon.py, run against the fake bpy layer in
+# fakebpy.py, so they work on a plain Linux machine without Blender. Each stage is timed on a synthetic scene with
+# N axes, M frames, K keyframes per axis and extra unrelated F-curves, and compared against a stored baseline.
+#
+# python benchmarks/MoCoBenchmarks.py
+# python benchmarks/MoCoBenchmarks.py --axes 36 --frames 50000 --stage sampleAxes --stage writeRawMove
+# python benchmarks/MoCoBenchmarks.py --save-baseline
+
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+benchmarkFolder = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, benchmarkFolder)
+sys.path.insert(0, os.path.dirname(benchmarkFolder))
+
+import numpy as np
+import fakebpy
+
+bpy = fakebpy.install()
+import MoCoExportAddon as addon
+
+defaultBaselinePath = os.path.join(benchmarkFolder, 'baseline.json')
+
+
+# Stages
+# Each stage is built by a function that takes the benchmark scene and returns the function to time and the number
+# of items it processes, for throughput. Setup work done in the builder isn't timed.
+
+def benchSampleAxes(scene, config):
+    scene.moco_sample_cache = '0'
+    return lambda: addon.sampleAxisPositions(scene), config['axes'] * config['frames']
+
+
+def benchSampleAxesCached(scene, config):
+    scene.moco_sample_cache = '1'
+    addon.sampleAxisPositions(scene)
+    return lambda: addon.sampleAxisPositions(scene), config['axes'] * config['frames']
+
+
+def benchReadKeyframes(scene, config):
+    def run():
+        addon.invalidateFCurveIndex()
+        for axisIndex in range(len(scene.moco_axes)):
+            addon.getKeyframeArrays(addon.getAxisFCurve(axisIndex))
+    return run, config['axes'] * config['keyframes']
+
+
+def benchWriteRawMove(scene, config):
+    positions = addon.sampleAxisPositions(scene)
+    return lambda: addon.writeRawMove(positions), config['axes'] * config['frames']
+
+
+# File writing alone, with the same amount of text as the Raw Move, to separate formatting from writing
+def benchFileWrite(scene, config):
+    filepath = addon.writeRawMove(addon.sampleAxisPositions(scene))
+    with open(filepath, 'r', newline = '') as file:
+        text = file.read()
+
+    def run():
+        with addon.ExportFileWriter('.txt') as writer:
+            for chunkStart in range(0, len(text), 1024 * 1024):
+                writer.write(text[chunkStart:chunkStart + 1024 * 1024])
+    return run, config['axes'] * config['frames']
+
+
+def benchWriteArcMove(scene, config):
+    scene.moco_arc_reduce = False
+    return lambda: addon.writeArcMove(scene), config['axes'] * config['keyframes']
+
+
+def benchReduceArcMove(scene, config):
+    def run():
+        scene.moco_arc_reduce = True
+        try:
+            addon.writeArcMove(scene)
+        finally:
+            scene.moco_arc_reduce = False
+    return run, config['axes'] * config['frames']
+
+
+def benchLimitCheck(scene, config):
+    positions = addon.sampleAxisPositions(scene)
+    times = addon.getSampleTimes(scene)
+    for axis in scene.moco_axes:
+        axis.maxvelocity = 1
+        axis.maxacceleration = 1
+        axis.maxjerk = 1
+    return lambda: addon.checkKinematicLimits(scene, positions, times), config['axes'] * config['frames']
+
+
+# Frame change handler during playback, with the axis inputs set by the animation system for each frame
+def benchHandlerUpdate(scene, config):
+    numFrames = min(config['frames'], config['playbackFrames'])
+    positions = addon.sampleAxisPositions(scene)[:, :numFrames].T.tolist()
+
+    def run():
+        for values in positions:
+            fakebpy.setAnimatedAxisValues(scene, values)
+            addon.animationUpdate(scene)
+    return run, numFrames
+
+
+def benchUpdateObjectPositions(scene, config):
+    numFrames = min(config['frames'], config['playbackFrames'])
+
+    def run():
+        for frame in range(numFrames):
+            addon.updateObjectPositions()
+    return run, numFrames
+
+
+# Panel and axis list redraws, with the rows a list of default height shows
+def benchPanelDraw(scene, config):
+    numDraws = config['playbackFrames']
+    panel = addon.View3dPanel()
+    panel.layout = fakebpy.Layout()
+    axisList = addon.MOCO_UL_axes()
+
+    def run():
+        for draw in range(numDraws):
+            panel.draw(bpy.context)
+            for index, axis in enumerate(scene.moco_axes[:5]):
+                axisList.draw_item(bpy.context, fakebpy.Layout(), scene, axis, 0, scene, 'moco_axis_index', index)
+    return run, numDraws
+
+
+# Raw Move import, into a separate scene so the benchmark scene keeps its keyframes
+def benchImportRawMove(scene, config):
+    filepath = addon.writeRawMove(addon.sampleAxisPositions(scene))
+    importScene = fakebpy.buildScene(bpy, addon, config['axes'], config['frames'], 2)
+    addon.props = scene
+    bpy.context.scene = scene
+
+    def run():
+        addon.importRawMove(importScene, filepath, False, False)
+        addon.props = scene
+    return run, config['axes'] * config['frames']
+
+
+stages = [
+    ('sampleAxes', benchSampleAxes),
+    ('sampleAxesCached', benchSampleAxesCached),
+    ('readKeyframes', benchReadKeyframes),
+    ('writeRawMove', benchWriteRawMove),
+    ('fileWrite', benchFileWrite),
+    ('writeArcMove', benchWriteArcMove),
+    ('reduceArcMove', benchReduceArcMove),
+    ('limitCheck', benchLimitCheck),
+    ('handlerUpdate', benchHandlerUpdate),
+    ('updateObjectPositions', benchUpdateObjectPositions),
+    ('panelDraw', benchPanelDraw),
+    ('importRawMove', benchImportRawMove),
+]
+
+
+# Time a stage as the best of a number of runs, then measure its peak traced memory in a separate run, since
+# tracing slows everything down. Stages shorter than minStageSeconds are run several times per timing.
+minStageSeconds = 0.1
+
+def runStage(builder, scene, config):
+    addon.props = scene
+    bpy.context.scene = scene
+    run, items = builder(scene, config)
+
+    startTime = time.perf_counter()
+    run()
+    firstSeconds = time.perf_counter() - startTime
+    loops = max(1, int(math.ceil(minStageSeconds / max(firstSeconds, 0.000001))))
+
+    times = []
+    for repeat in range(config['repeat']):
+        startTime = time.perf_counter()
+        for loop in range(loops):
+            run()
+        times.append((time.perf_counter() - startTime) / loops)
+
+    tracemalloc.start()
+    run()
+    peakBytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    seconds = min(times)
+    return {'seconds': seconds, 'itemsPerSecond': items / seconds if seconds > 0 else None, 'peakMB': peakBytes / (1024 * 1024)}
+
+
+# Stages that are slower than the baseline by more than the threshold factor
+def compareToBaseline(results, baseline, threshold):
+    regressions = {}
+    for name, result in results.items():
+        baselineResult = baseline['stages'].get(name)
+        if baselineResult is None:
+            continue
+        ratio = result['seconds'] / baselineResult['seconds'] if baselineResult['seconds'] > 0 else 1
+        result['baselineRatio'] = ratio
+        if ratio > threshold:
+            regressions[name] = ratio
+    return regressions
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Benchmark the MoCo Export addon hot paths without Blender.")
+    parser.add_argument('--axes', type = int, default = 36, help = "Number of axes in the synthetic scene.")
+    parser.add_argument('--frames', type = int, default = 10000, help = "Number of frames in the synthetic scene.")
+    parser.add_argument('--keyframes', type = int, default = 40, help = "Bezier keyframes per axis.")
+    parser.add_argument('--extra-fcurves', type = int, default = 500, help = "Unrelated F-curves in the scene action.")
+    parser.add_argument('--playback-frames', type = int, default = 1000, help = "Frames of playback for the handler and drawing stages.")
+    parser.add_argument('--repeat', type = int, default = 5, help = "Runs of each stage. The fastest is reported.")
+    parser.add_argument('--stage', action = 'append', choices = [name for name, builder in stages], help = "Stage to run. Can be given more than once. Defaults to all stages.")
+    parser.add_argument('--baseline', default = defaultBaselinePath, help = "Baseline JSON to compare against.")
+    parser.add_argument('--save-baseline', action = 'store_true', help = "Store the results as the new baseline.")
+    parser.add_argument('--threshold', type = float, default = 1.5, help = "Slowdown factor against the baseline that counts as a regression.")
+    parser.add_argument('--json', action = 'store_true', help = "Print the results as JSON.")
+    args = parser.parse_args(argv)
+
+    config = {'axes': args.axes, 'frames': args.frames, 'keyframes': args.keyframes, 'extraFCurves': args.extra_fcurves, 'playbackFrames': args.playback_frames, 'repeat': args.repeat}
+
+    folder = tempfile.mkdtemp(prefix = 'moco_benchmark_')
+    try:
+        addon.register()
+        bpy.data.filepath = os.path.join(folder, 'benchmark.blend')
+        bpy.data.is_saved = True
+        scene = fakebpy.buildScene(bpy, addon, args.axes, args.frames, args.keyframes, extraFCurves = args.extra_fcurves)
+
+        results = {}
+        for name, builder in stages:
+            if args.stage is None or name in args.stage:
+                results[name] = runStage(builder, scene, config)
+                addon.clearSampleCache()
+    finally:
+        shutil.rmtree(folder, ignore_errors = True)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+
+    regressions = {}
+    baselineConfig = None
+    if not (baseline is None):
+        baselineConfig = {name: value for name, value in baseline['config'].items() if name != 'repeat'}
+        if baselineConfig == {name: value for name, value in config.items() if name != 'repeat'}:
+            regressions = compareToBaseline(results, baseline, args.threshold)
+        else:
+            baseline = None
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump({'config': config, 'stages': results}, file, indent = 2)
+            file.write('\n')
+
+    if args.json:
+        print(json.dumps({'config': config, 'stages': results, 'regressions': regressions}, indent = 2))
+    else:
+        print("%d axes, %d frames, %d keyframes per axis, %d extra F-curves" % (args.axes, args.frames, args.keyframes, args.extra_fcurves))
+        print("%-22s %10s %14s %10s %10s" % ("stage", "seconds", "items/s", "peak MB", "baseline"))
+        for name, result in results.items():
+            ratio = result.get('baselineRatio')
+            print("%-22s %10.4f %14.0f %10.2f %10s" % (name, result['seconds'], result['itemsPerSecond'] or 0, result['peakMB'], "" if ratio is None else "%.2fx" % ratio) + ("  REGRESSION" if name in regressions else ""))
+        if not (baselineConfig is None) and baseline is None:
+            print("Baseline was recorded with different scene settings and wasn't compared")
+        if args.save_baseline:
+            print("Baseline saved to " + args.baseline)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,487 @@
+# Lightweight stand-in for the parts of bpy, mathutils and bpy_extras that MoCoExportAddon.py uses, so the addon can
+# be imported, benchmarked and smoke tested on a plain Python install without Blender. Only behaviour the addon relies
+# on is modelled: RNA style properties with defaults and update callbacks, collections with foreach_get/foreach_set,
+# keyframe points stored as NumPy arrays, scene actions evaluated on frame_set, and a layout that accepts any call.
+#
+# bpy = fakebpy.install()
+# import MoCoExportAddon
+# scene = fakebpy.buildScene(bpy, MoCoExportAddon, numAxes = 36, numFrames = 10000, keyframesPerAxis = 40)
+
+import sys
+import types
+import numpy as np
+
+
+# Properties
+
+class PropertyDefinition:
+    def __init__(self, kind, **options):
+        self.kind = kind
+        self.options = options
+
+    def default(self):
+        if self.kind == 'collection':
+            return Collection(self.options['type'])
+        if 'default' in self.options:
+            return self.options['default']
+        if self.kind == 'enum':
+            return self.options['items'][0][0]
+        return {'string': "", 'float': 0.0, 'int': 0, 'bool': False, 'pointer': None}[self.kind]
+
+
+def makeProps():
+    props = types.ModuleType('bpy.props')
+    for name, kind in [('StringProperty', 'string'), ('FloatProperty', 'float'), ('IntProperty', 'int'), ('BoolProperty', 'bool'), ('EnumProperty', 'enum'), ('CollectionProperty', 'collection'), ('PointerProperty', 'pointer'), ('FloatVectorProperty', 'vector')]:
+        props.__dict__[name] = (lambda kind: lambda **options: PropertyDefinition(kind, **options))(kind)
+    return props
+
+
+# Property definitions of a class, cached until properties are added to or removed from the class or its bases
+definitionCache = {}
+
+def getDefinitions(cls):
+    key = tuple(len(vars(klass)) for klass in cls.__mro__)
+    cached = definitionCache.get(cls)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    definitions = {}
+    for klass in reversed(cls.__mro__):
+        for name, value in vars(klass).items():
+            if isinstance(value, PropertyDefinition):
+                definitions[name] = value
+        for name, value in vars(klass).get('__annotations__', {}).items():
+            if isinstance(value, PropertyDefinition):
+                definitions[name] = value
+    definitionCache[cls] = (key, definitions)
+    return definitions
+
+
+class Struct:
+    _pointerCounter = [1000]
+
+    def __init__(self, **values):
+        object.__setattr__(self, '_values', {})
+        object.__setattr__(self, '_idProperties', {})
+        Struct._pointerCounter[0] += 1
+        object.__setattr__(self, '_pointer', Struct._pointerCounter[0])
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def as_pointer(self):
+        return self._pointer
+
+    def __getattribute__(self, name):
+        value = object.__getattribute__(self, name)
+        if isinstance(value, PropertyDefinition):
+            values = object.__getattribute__(self, '_values')
+            if name not in values:
+                values[name] = value.default()
+            return values[name]
+        return value
+
+    def __getattr__(self, name):
+        definitions = getDefinitions(type(self))
+        if name in definitions:
+            values = self._values
+            if name not in values:
+                values[name] = definitions[name].default()
+            return values[name]
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        definitions = getDefinitions(type(self))
+        if name in definitions:
+            self._values[name] = value
+            update = definitions[name].options.get('update')
+            if update is not None:
+                update(self, context)
+        else:
+            object.__setattr__(self, name, value)
+
+    # ID properties
+    def get(self, key, default = None):
+        return self._idProperties.get(key, default)
+
+    def keys(self):
+        return self._idProperties.keys()
+
+    def __contains__(self, key):
+        return key in self._idProperties
+
+    def __getitem__(self, key):
+        return self._idProperties[key]
+
+    def __setitem__(self, key, value):
+        self._idProperties[key] = value
+
+    def __delitem__(self, key):
+        del self._idProperties[key]
+
+
+class Collection(list):
+    def __init__(self, itemType = None, items = ()):
+        super().__init__(items)
+        self.itemType = itemType
+
+    def add(self):
+        item = self.itemType()
+        self.append(item)
+        return item
+
+    def remove(self, item):
+        if isinstance(item, int):
+            del self[item]
+        else:
+            list.remove(self, item)
+
+    def move(self, fromIndex, toIndex):
+        self.insert(toIndex, self.pop(fromIndex))
+
+    def get(self, name, default = None):
+        for item in self:
+            if getattr(item, 'name', None) == name:
+                return item
+        return default
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            item = self.get(key)
+            if item is None:
+                raise KeyError(key)
+            return item
+        return list.__getitem__(self, key)
+
+    def find(self, name):
+        for index, item in enumerate(self):
+            if getattr(item, 'name', None) == name:
+                return index
+        return -1
+
+    # Matrices are returned column major, like Blender
+    def foreach_get(self, attribute, array):
+        values = [getattr(item, attribute) for item in self]
+        if attribute.startswith('matrix'):
+            values = [np.asarray(value).T for value in values]
+        array[:] = np.asarray(values, dtype = array.dtype).ravel()
+
+    def foreach_set(self, attribute, array):
+        width = len(array) // max(1, len(self))
+        for index, item in enumerate(self):
+            value = array[index * width:(index + 1) * width]
+            setattr(item, attribute, value[0] if width == 1 else list(value))
+
+
+# Animation data
+
+interpolationValues = {'CONSTANT': 0, 'LINEAR': 1, 'BEZIER': 2}
+interpolationNames = {value: name for name, value in interpolationValues.items()}
+
+
+class Keyframe(Struct):
+    def __init__(self, co = (0.0, 0.0), interpolation = 'BEZIER'):
+        super().__init__()
+        self.co = list(co)
+        self.handle_left = [co[0] - 1, co[1]]
+        self.handle_right = [co[0] + 1, co[1]]
+        self.interpolation = interpolation
+        self.handle_left_type = 'AUTO_CLAMPED'
+        self.handle_right_type = 'AUTO_CLAMPED'
+
+
+class KeyframePoints:
+    def __init__(self):
+        self.co = np.zeros((0, 2))
+        self.handleLeft = np.zeros((0, 2))
+        self.handleRight = np.zeros((0, 2))
+        self.interpolation = np.zeros(0, dtype = np.int32)
+
+    def __len__(self):
+        return len(self.co)
+
+    def add(self, count):
+        self.co = np.concatenate([self.co, np.zeros((count, 2))])
+        self.handleLeft = np.concatenate([self.handleLeft, np.zeros((count, 2))])
+        self.handleRight = np.concatenate([self.handleRight, np.zeros((count, 2))])
+        self.interpolation = np.concatenate([self.interpolation, np.full(count, 2, dtype = np.int32)])
+
+    def clear(self):
+        self.__init__()
+
+    def insert(self, frame, value, options = None):
+        self.add(1)
+        self.co[-1] = (frame, value)
+        self.handleLeft[-1] = (frame - 1, value)
+        self.handleRight[-1] = (frame + 1, value)
+        order = np.argsort(self.co[:, 0], kind = 'stable')
+        for name in ['co', 'handleLeft', 'handleRight', 'interpolation']:
+            setattr(self, name, getattr(self, name)[order])
+
+    def _array(self, attribute):
+        return {'co': self.co, 'handle_left': self.handleLeft, 'handle_right': self.handleRight, 'interpolation': self.interpolation}.get(attribute)
+
+    def foreach_get(self, attribute, array):
+        values = self._array(attribute)
+        if values is None:
+            return
+        array[:] = values.ravel()
+
+    def foreach_set(self, attribute, array):
+        values = self._array(attribute)
+        if values is None:
+            return
+        values.ravel()[:] = np.asarray(array, dtype = values.dtype)
+
+    def __getitem__(self, index):
+        return types.SimpleNamespace(co = self.co[index], handle_left = self.handleLeft[index], handle_right = self.handleRight[index], interpolation = interpolationNames.get(int(self.interpolation[index]), 'BEZIER'))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class FCurve(Struct):
+    def __init__(self, data_path, array_index = 0):
+        super().__init__()
+        self.data_path = data_path
+        self.array_index = array_index
+        self.keyframe_points = KeyframePoints()
+        self.extrapolation = 'CONSTANT'
+        self.modifiers = []
+        self.mute = False
+        self.group = None
+
+    def evaluate(self, frame):
+        from MoCoExportAddon import evaluateKeyframes
+        points = self.keyframe_points
+        return float(evaluateKeyframes(points.co, points.handleLeft, points.handleRight, points.interpolation, self.extrapolation == 'LINEAR', [frame])[0])
+
+    def update(self):
+        pass
+
+
+class FCurves(Collection):
+    def new(self, data_path, index = 0, action_group = ""):
+        fcurve = FCurve(data_path, index)
+        self.append(fcurve)
+        return fcurve
+
+    def find(self, data_path, index = 0):
+        for fcurve in self:
+            if fcurve.data_path == data_path and fcurve.array_index == index:
+                return fcurve
+
+
+class Action(Struct):
+    def __init__(self, name = "Action"):
+        super().__init__()
+        self.name = name
+        self.fcurves = FCurves()
+
+
+class Actions(Collection):
+    def new(self, name):
+        action = Action(name)
+        self.append(action)
+        return action
+
+
+class AnimationData(Struct):
+    def __init__(self):
+        super().__init__()
+        self.action = None
+        self.drivers = FCurves()
+        self.use_nla = True
+        self.nla_tracks = []
+
+
+# Scene and objects
+
+class Object(Struct):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.location = [0.0, 0.0, 0.0]
+        self.rotation_euler = [0.0, 0.0, 0.0]
+        self.rotation_mode = 'XYZ'
+        self.matrix_world = np.identity(4)
+        self.matrix_parent_inverse = np.identity(4)
+        self.parent = None
+        self.animation_data = None
+        self.constraints = []
+        self.animateMatrix = None
+
+    def animation_data_create(self):
+        if self.animation_data is None:
+            self.animation_data = AnimationData()
+        return self.animation_data
+
+    def evaluated_get(self, depsgraph):
+        return self
+
+
+class ViewLayer(Struct):
+    def __init__(self):
+        super().__init__()
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+
+
+class Scene(Struct):
+    def __init__(self, name = "Scene"):
+        super().__init__()
+        self.name = name
+        self.objects = Collection()
+        self.frame_start = 1
+        self.frame_end = 250
+        self.frame_current = 1
+        self.frame_current_final = 1.0
+        self.animation_data = None
+        self.unit_settings = types.SimpleNamespace(system = 'METRIC', system_rotation = 'DEGREES', scale_length = 1.0)
+        self.render = types.SimpleNamespace(fps = 24, fps_base = 1.0)
+        self.view_layers = [ViewLayer()]
+
+    def animation_data_create(self):
+        if self.animation_data is None:
+            self.animation_data = AnimationData()
+        return self.animation_data
+
+    # Setting a frame evaluates the scene action into its properties and runs frame change handlers
+    def frame_set(self, frame, subframe = 0.0):
+        self.frame_current = frame
+        self.frame_current_final = frame + subframe
+        time = frame + subframe
+        if self.animation_data is not None and self.animation_data.action is not None:
+            for fcurve in self.animation_data.action.fcurves:
+                match = fcurve.data_path.split('.')
+                if fcurve.data_path.startswith('moco_axes['):
+                    index = int(fcurve.data_path[len('moco_axes['):fcurve.data_path.index(']')])
+                    if index < len(self.moco_axes):
+                        self.moco_axes[index]._values[match[-1]] = fcurve.evaluate(time)
+        for obj in self.objects:
+            if obj.animateMatrix is not None:
+                obj.matrix_world = obj.animateMatrix(time)
+        for handler in list(app.handlers.frame_change_post):
+            handler(self, None)
+
+
+# Set animated property values the way Blender does during playback, without running update callbacks.
+# values has one value per axis.
+def setAnimatedAxisValues(scene, values):
+    for axis, value in zip(scene.moco_axes, values):
+        attribute = 'setrot' if int(axis.component) in (3, 4, 5) else 'setlength'
+        axis._values[attribute] = value
+
+
+# UI
+
+# Layout that accepts any call and attribute, for running panel and list draw code
+class Layout:
+    def __getattr__(self, name):
+        return lambda *args, **options: Layout()
+
+
+# Module
+
+def install():
+    bpy = types.ModuleType('bpy')
+    global app, context
+
+    bpyTypes = types.ModuleType('bpy.types')
+    for name in ['Panel', 'Operator', 'UIList', 'Menu']:
+        bpyTypes.__dict__[name] = type(name, (), {})
+    bpyTypes.PropertyGroup = type('PropertyGroup', (Struct,), {})
+    bpyTypes.Scene = Scene
+    bpyTypes.Object = Object
+
+    app = types.ModuleType('bpy.app')
+    app.background = True
+    app.version = (3, 6, 0)
+    handlers = types.ModuleType('bpy.app.handlers')
+    for name in ['frame_change_post', 'frame_change_pre', 'load_post', 'undo_post', 'redo_post', 'depsgraph_update_post', 'save_pre', 'load_pre']:
+        setattr(handlers, name, [])
+    handlers.persistent = lambda function: function
+    app.handlers = handlers
+    timers = types.ModuleType('bpy.app.timers')
+    timers.register = lambda function, first_interval = 0, persistent = False: None
+    timers.unregister = lambda function: None
+    timers.is_registered = lambda function: False
+    app.timers = timers
+
+    data = types.SimpleNamespace(objects = Collection(), scenes = Collection(), filepath = "", is_saved = False, texts = Collection())
+    data.actions = Actions()
+
+    def abspath(path, start = None):
+        import os
+        if path.startswith('//'):
+            return os.path.join(os.path.dirname(data.filepath), path[2:])
+        return path
+
+    bpy.types = bpyTypes
+    bpy.props = makeProps()
+    bpy.app = app
+    bpy.data = data
+    bpy.path = types.SimpleNamespace(abspath = abspath)
+    bpy.utils = types.SimpleNamespace(register_class = lambda cls: None, unregister_class = lambda cls: None)
+    bpy.ops = types.SimpleNamespace()
+    context = types.SimpleNamespace(scene = None, view_layer = ViewLayer(), window = None, window_manager = None, screen = None)
+    bpy.context = context
+
+    mathutils = types.ModuleType('mathutils')
+    mathutils.Vector = lambda values: np.array(values, dtype = float)
+    mathutils.Matrix = lambda values: np.array(values, dtype = float)
+    bmesh = types.ModuleType('bmesh')
+
+    bpyExtras = types.ModuleType('bpy_extras')
+    ioUtils = types.ModuleType('bpy_extras.io_utils')
+    ioUtils.ImportHelper = type('ImportHelper', (), {})
+    ioUtils.ExportHelper = type('ExportHelper', (), {})
+    bpyExtras.io_utils = ioUtils
+
+    modules = {'bpy': bpy, 'bpy.types': bpyTypes, 'bpy.props': bpy.props, 'bpy.app': app, 'bpy.app.handlers': handlers, 'bpy.app.timers': timers, 'mathutils': mathutils, 'bmesh': bmesh, 'bpy_extras': bpyExtras, 'bpy_extras.io_utils': ioUtils}
+    sys.modules.update(modules)
+    return bpy
+
+
+# Build a scene with numAxes axes over numFrames frames, keyframesPerAxis bezier keyframes on each axis,
+# and extraFCurves unrelated F-curves in the scene action
+def buildScene(bpy, addon, numAxes, numFrames, keyframesPerAxis, extraFCurves = 0, seed = 0):
+    random = np.random.default_rng(seed)
+    scene = Scene()
+    scene.frame_start = 1
+    scene.frame_end = numFrames
+    bpy.data.scenes.append(scene)
+    bpy.context.scene = scene
+    addon.props = scene
+
+    action = Action()
+    scene.animation_data_create().action = action
+    for index in range(extraFCurves):
+        fcurve = action.fcurves.new('["unrelated_' + str(index) + '"]')
+        fcurve.keyframe_points.insert(1, 0.0)
+
+    for axisIndex in range(numAxes):
+        obj = Object("Axis" + str(axisIndex))
+        scene.objects.append(obj)
+        bpy.data.objects.append(obj)
+
+        axis = scene.moco_axes.add()
+        axis._values.update(label = "Axis " + str(axisIndex), component = str(axisIndex % 6), object = obj.name)
+
+        attribute = 'setrot' if axisIndex % 6 >= 3 else 'setlength'
+        fcurve = action.fcurves.new('moco_axes[' + str(axisIndex) + '].' + attribute)
+        points = fcurve.keyframe_points
+        points.add(keyframesPerAxis)
+        frames = np.linspace(1, numFrames, keyframesPerAxis)
+        values = random.uniform(-1, 1, keyframesPerAxis)
+        points.co[:, 0] = frames
+        points.co[:, 1] = values
+        spacing = (frames[1] - frames[0]) / 3 if keyframesPerAxis > 1 else 1
+        points.handleLeft[:] = points.co - [spacing, 0]
+        points.handleRight[:] = points.co + [spacing, 0]
+
+    addon.invalidateAxisTable()
+    addon.invalidateFCurveIndex()
+    return scene
@@ -0,0 +1,15 @@
+# The addon is imported with the fake bpy layer from the benchmarks, so the tests run without Blender
+
+import os
+import sys
+
+testFolder = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(testFolder), 'benchmarks'))
+sys.path.insert(0, os.path.dirname(testFolder))
+
+import fakebpy
+
+fakebpy.install()
+import MoCoExportAddon
+
+MoCoExportAddon.register()
@@ -0,0 +1,95 @@
+# Records F-curve samples evaluated by Blender itself, as the reference for test_evaluateKeyframes.py. Each case is
+# built as a real F-curve with free handles, read back from Blender so the stored keyframes are the float32 values
+# Blender evaluates, and sampled with fcurve.evaluate.
+#
+# blender -b --factory-startup --python tests/recordFCurveSamples.py
+# python tests/recordFCurveSamples.py      (with the bpy module from PyPI)
+
+import os
+import sys
+import json
+
+import bpy
+
+fixturePath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'blenderFCurveSamples.json')
+
+# Keyframes are (x, y, handle left, handle right, interpolation)
+cases = [
+    {'name': 'constant', 'extrapolation': 'CONSTANT', 'keyframes': [
+        (1, 0, (0, 0), (2, 0), 'CONSTANT'), (5, 2, (4, 2), (6, 2), 'CONSTANT'), (9, -1, (8, -1), (10, -1), 'CONSTANT')]},
+    {'name': 'linear', 'extrapolation': 'CONSTANT', 'keyframes': [
+        (1, 0, (0, 0), (2, 0), 'LINEAR'), (4, 3, (3, 3), (5, 3), 'LINEAR'), (10, -2, (9, -2), (11, -2), 'LINEAR')]},
+    {'name': 'bezier', 'extrapolation': 'CONSTANT', 'keyframes': [
+        (1, 0, (0, -0.5), (2.5, 0.5), 'BEZIER'), (6, 4, (4.5, 4.5), (7, 3.5), 'BEZIER'), (12, -1, (10, -1.5), (13, 0), 'BEZIER')]},
+    {'name': 'bezierOvershootingHandles', 'extrapolation': 'CONSTANT', 'keyframes': [
+        (1, 0, (-3, -2), (7, 5), 'BEZIER'), (4, 1, (-1, 3), (6, 0), 'BEZIER'), (8, -2, (5, -6), (12, 1), 'BEZIER')]},
+    {'name': 'mixedInterpolation', 'extrapolation': 'CONSTANT', 'keyframes': [
+        (0, 1, (-1, 1), (1, 2), 'BEZIER'), (3, -1, (2, -2), (4, 0), 'CONSTANT'), (5, 2, (4, 2), (6, 2), 'LINEAR'), (9, 0, (8, 1), (10, -1), 'BEZIER'), (12, 3, (11, 3), (13, 3), 'BEZIER')]},
+    {'name': 'linearExtrapolationLinearEnds', 'extrapolation': 'LINEAR', 'keyframes': [
+        (2, 1, (1, 1), (3, 1), 'LINEAR'), (5, 4, (4, 4), (6, 4), 'BEZIER'), (8, 2, (7, 2.5), (9, 1.5), 'LINEAR'), (11, 3, (10, 3), (12, 3), 'LINEAR')]},
+    {'name': 'linearExtrapolationBezierEnds', 'extrapolation': 'LINEAR', 'keyframes': [
+        (2, 1, (0, 2), (3, 0.5), 'BEZIER'), (6, 3, (5, 2), (7, 4), 'BEZIER'), (10, 0, (9, 1), (12, -3), 'BEZIER')]},
+    {'name': 'linearExtrapolationConstantEnds', 'extrapolation': 'LINEAR', 'keyframes': [
+        (2, 1, (1, 0), (3, 2), 'CONSTANT'), (6, 3, (5, 2), (7, 4), 'LINEAR'), (10, 0, (9, 1), (11, -1), 'CONSTANT')]},
+    {'name': 'singleKeyframe', 'extrapolation': 'LINEAR', 'keyframes': [
+        (3, 2.5, (2, 1), (4, 4), 'BEZIER')]},
+]
+
+
+def getSampleTimes(keyframes):
+    start = keyframes[0][0] - 3
+    end = keyframes[-1][0] + 3
+    times = [start + (end - start) * index / 96 for index in range(97)]
+    # Around each keyframe, inside and outside the keyframe threshold
+    for keyframe in keyframes:
+        times += [keyframe[0] + offset for offset in (-0.0002, -0.00005, 0.00005, 0.0002)]
+    return sorted(set(times))
+
+
+def recordCase(action, dataPath, case):
+    fcurve = action.fcurve_ensure_for_datablock(bpy.data.objects['Sampler'], dataPath, index = 0)
+    fcurve.extrapolation = case['extrapolation']
+    fcurve.keyframe_points.add(len(case['keyframes']))
+    for keyframe, (x, y, handleLeft, handleRight, interpolation) in zip(fcurve.keyframe_points, case['keyframes']):
+        keyframe.handle_left_type = 'FREE'
+        keyframe.handle_right_type = 'FREE'
+        keyframe.co = (x, y)
+        keyframe.handle_left = handleLeft
+        keyframe.handle_right = handleRight
+        keyframe.interpolation = interpolation
+        
+    times = getSampleTimes(case['keyframes'])
+    return {
+        'name': case['name'],
+        'extrapolation': case['extrapolation'],
+        'co': [list(keyframe.co) for keyframe in fcurve.keyframe_points],
+        'handleLeft': [list(keyframe.handle_left) for keyframe in fcurve.keyframe_points],
+        'handleRight': [list(keyframe.handle_right) for keyframe in fcurve.keyframe_points],
+        'interpolation': [keyframe.interpolation for keyframe in fcurve.keyframe_points],
+        'times': times,
+        'values': [fcurve.evaluate(time) for time in times],
+    }
+
+
+def main():
+    bpy.ops.wm.read_factory_settings(use_empty = True)
+    sampler = bpy.data.objects.new('Sampler', None)
+    bpy.context.scene.collection.objects.link(sampler)
+    sampler.animation_data_create()
+    action = bpy.data.actions.new('Samples')
+    sampler.animation_data.action = action
+    
+    # One custom property per case, so every case has its own F-curve
+    records = []
+    for caseIndex, case in enumerate(cases):
+        sampler['case' + str(caseIndex)] = 0.0
+        records.append(recordCase(action, '["case' + str(caseIndex) + '"]', case))
+        
+    with open(fixturePath, 'w') as file:
+        json.dump({'blender': bpy.app.version_string, 'cases': records}, file, indent = 1)
+        file.write('\n')
+    print("Recorded " + str(len(records)) + " cases to " + fixturePath)
+    
+    
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+# Axis table
+
+import bpy
+import fakebpy
+
+import MoCoExportAddon as addon
+
+
+def runDepsgraphHandlers(scene):
+    for handler in bpy.app.handlers.depsgraph_update_post:
+        handler(scene, None)
+
+
+# An axis object that is deleted and replaced by a new object of the same name is picked up, although the number
+# of objects is the same as when the table was built
+def test_replacedObjectRebuildsTable():
+    scene = fakebpy.buildScene(bpy, addon, 2, 10, 2)
+    runDepsgraphHandlers(scene)
+    oldObject = addon.getAxisTable()[0].object
+    assert oldObject.name == "Axis0"
+    
+    scene.objects.remove(oldObject)
+    bpy.data.objects.remove(oldObject)
+    runDepsgraphHandlers(scene)
+    
+    newObject = fakebpy.Object("Axis0")
+    scene.objects.append(newObject)
+    bpy.data.objects.append(newObject)
+    runDepsgraphHandlers(scene)
+    
+    assert addon.getAxisTable()[0].object is newObject
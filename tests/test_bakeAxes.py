@@ -0,0 +1,40 @@
+# Releasing the object animation that a bake replaces
+
+import bpy
+import fakebpy
+
+import MoCoExportAddon as addon
+
+
+def buildCameraScene(constraints):
+    scene = fakebpy.buildScene(bpy, addon, 0, 10, 0)
+    camera = fakebpy.Object("Camera")
+    scene.objects.append(camera)
+    camera.constraints = [fakebpy.Struct(name = name, type = constraintType, mute = False, **settings) for name, constraintType, settings in constraints]
+    for component in ['0', '1', '2', '3', '4', '5']:
+        axis = scene.moco_axes.add()
+        axis._values.update(label = "Camera " + component, component = component, object = camera.name)
+    addon.invalidateAxisTable()
+    return scene, camera
+
+
+def getEntries(components):
+    return [entry for entry in addon.getAxisTable() if entry.component in components]
+
+
+def test_keepsConstraintsOfChannelsThatWerentBaked():
+    scene, camera = buildCameraScene([("Track To", 'TRACK_TO', {}), ("Child Of", 'CHILD_OF', {}), ("Copy X", 'COPY_LOCATION', {'use_x': True, 'use_y': False, 'use_z': False}), ("Scale", 'LIMIT_SCALE', {})])
+    kept = addon.releaseObjectAnimation(getEntries([0]), False)
+    
+    assert [constraint.mute for constraint in camera.constraints] == [False, False, True, False]
+    assert kept == ["Camera: Track To", "Camera: Child Of", "Camera: Scale"]
+    
+    
+def test_releasesConstraintsWhenAllTheirChannelsAreBaked():
+    scene, camera = buildCameraScene([("Track To", 'TRACK_TO', {}), ("Child Of", 'CHILD_OF', {}), ("Scale", 'LIMIT_SCALE', {})])
+    kept = addon.releaseObjectAnimation(getEntries([3, 4, 5]), True)
+    assert [constraint.name for constraint in camera.constraints] == ["Child Of", "Scale"]
+    
+    kept = addon.releaseObjectAnimation(getEntries([0, 1, 2, 3, 4, 5]), True)
+    assert [constraint.name for constraint in camera.constraints] == ["Scale"]
+    assert kept == ["Camera: Scale"]
@@ -0,0 +1,46 @@
+# Batch export
+
+import json
+
+import bpy
+import fakebpy
+
+import MoCoBatchExport
+import MoCoExportAddon as addon
+
+
+# Only jobs that would write the same files get a suffix
+def test_suffixesOnlyCollidingJobs():
+    outputs = {
+        '/takes/shot010.blend': ({'Scene': '/takes/CameraMovement'}, 'Scene'),
+        '/takes/shot020.blend': ({'Scene': '/takes/CameraMovement'}, 'Scene'),
+        '/takes/shot030.blend': ({'Scene': '/takes/Shot030'}, 'Scene'),
+        '/takes/alt.blend': ({'Main': '/takes/Alt', 'Alt': '/takes/Alt', 'Other': '/takes/Other'}, 'Main'),
+    }
+    jobs = [('/takes/shot010.blend', None), ('/takes/shot020.blend', None), ('/takes/shot030.blend', None), ('/takes/alt.blend', 'Main'), ('/takes/alt.blend', 'Alt'), ('/takes/alt.blend', 'Other'), ('/takes/missing.blend', None)]
+    
+    suffixes = MoCoBatchExport.getJobSuffixes(jobs, outputs)
+    assert suffixes == ['_shot010', '_shot020', '', '_Main', '_Alt', '', '']
+    
+    
+# The active scene given again by name gets a different suffix than the job exporting it as the active scene
+def test_suffixesStayUnique():
+    outputs = {'/takes/shot010.blend': ({'Scene': '/takes/CameraMovement'}, 'Scene')}
+    jobs = [('/takes/shot010.blend', None), ('/takes/shot010.blend', 'Scene')]
+    
+    suffixes = MoCoBatchExport.getJobSuffixes(jobs, outputs)
+    assert suffixes == ['_Scene', '_Scene_2']
+
+
+# --list-outputs reports the export path of every scene without exporting
+def test_listsOutputs(tmp_path, capsys):
+    bpy.data.filepath = str(tmp_path / 'test.blend')
+    scene = fakebpy.buildScene(bpy, addon, 1, 10, 2)
+    scene.camera_path_file_name = "Take"
+    
+    assert addon.runBatchExport(['--list-outputs']) == 0
+    line = capsys.readouterr().out.strip().splitlines()[-1]
+    result = json.loads(line[len(addon.batchResultPrefix):])
+    assert result['scene'] == scene.name
+    assert result['outputs'][scene.name] == str(tmp_path / 'Take')
+    assert not (tmp_path / 'Take.txt').exists()
@@ -0,0 +1,65 @@
+# Kinematic limit check
+
+import bpy
+import fakebpy
+import numpy as np
+import pytest
+
+import MoCoExportAddon as addon
+
+
+# Frames 1 to 10 at 24 fps. The move holds, moves one unit per frame from frame 4 to 8 and holds again, so its
+# velocity is 24/s, its acceleration 576/s2 when it starts and stops, and its jerk 13824/s3 around those frames.
+times = np.arange(1, 11, dtype = np.float64)
+move = np.array([0, 0, 0, 0, 1, 2, 3, 4, 4, 4], dtype = np.float64)
+
+
+def buildLimitScene(limits):
+    scene = fakebpy.buildScene(bpy, addon, len(limits), 10, 2)
+    for axis, (maxvelocity, maxacceleration, maxjerk) in zip(scene.moco_axes, limits):
+        axis._values.update(maxvelocity = maxvelocity, maxacceleration = maxacceleration, maxjerk = maxjerk)
+    return scene
+
+
+# Each run of samples over a limit is one violation, with the frames it spans and its peak, sorted by first frame
+def test_findsViolations():
+    scene = buildLimitScene([(10, 100, 1000)])
+    
+    violations = addon.checkKinematicLimits(scene, move[None, :], times)
+    assert violations == [
+        (0, 3, 2.0, 6.0, pytest.approx(13824), 1000),
+        (0, 2, 3.0, 5.0, pytest.approx(576), 100),
+        (0, 1, 4.0, 8.0, pytest.approx(24), 10),
+        (0, 3, 6.0, 10.0, pytest.approx(13824), 1000),
+        (0, 2, 7.0, 9.0, pytest.approx(576), 100),
+    ]
+
+
+# Limits at or above the peaks aren't exceeded
+def test_withinLimits():
+    scene = buildLimitScene([(24.001, 576.001, 13824.001)])
+    
+    assert addon.checkKinematicLimits(scene, move[None, :], times) == []
+
+
+# A limit of 0 is not checked, for each order on its own
+def test_zeroLimitIsNotChecked():
+    scene = buildLimitScene([(0, 0, 0), (10, 0, 0), (0, 0, 1000)])
+    positions = np.stack([move * 1000, move, move])
+    
+    violations = addon.checkKinematicLimits(scene, positions, times)
+    assert [(axisIndex, order) for axisIndex, order, firstFrame, lastFrame, peak, limit in violations] == [(1, 1), (2, 3), (2, 3)]
+
+
+# Rotation limits are in degrees, and the sample spacing sets the time step
+def test_rotationInDegrees():
+    scene = buildLimitScene([(0, 0, 0), (0, 0, 0), (0, 0, 0), (20, 0, 0)])
+    positions = np.zeros((4, 10))
+    positions[3] = np.radians(move)
+    
+    violations = addon.checkKinematicLimits(scene, positions, times)
+    assert violations == [(3, 1, 4.0, 8.0, pytest.approx(24), 20)]
+    
+    halfFrames = np.arange(1, 6, 0.5)
+    violations = addon.checkKinematicLimits(scene, positions, halfFrames)
+    assert violations == [(3, 1, 2.5, 4.5, pytest.approx(48), 20)]
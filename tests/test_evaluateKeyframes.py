@@ -0,0 +1,51 @@
+# evaluateKeyframes against F-curve samples recorded from Blender by recordFCurveSamples.py
+
+import os
+import json
+
+import numpy as np
+import pytest
+
+import MoCoExportAddon as addon
+
+testFolder = os.path.dirname(os.path.abspath(__file__))
+
+with open(os.path.join(testFolder, 'fixtures', 'blenderFCurveSamples.json'), 'r') as file:
+    recorded = json.load(file)
+
+# Blender evaluates in float32
+tolerance = 0.00002
+
+
+def evaluateCase(case, times = None):
+    interpolation = np.array([addon.interpolationModes[mode] for mode in case['interpolation']], dtype = np.int32)
+    return addon.evaluateKeyframes(np.array(case['co']), np.array(case['handleLeft']), np.array(case['handleRight']), interpolation, case['extrapolation'] == 'LINEAR', case['times'] if times is None else times)
+
+
+def getCase(name):
+    return next(case for case in recorded['cases'] if case['name'] == name)
+
+
+@pytest.mark.parametrize('case', recorded['cases'], ids = [case['name'] for case in recorded['cases']])
+def test_matchesBlender(case):
+    np.testing.assert_allclose(evaluateCase(case), case['values'], rtol = 0, atol = tolerance)
+
+
+# Times within the keyframe threshold return the keyframe value exactly, as recorded from Blender
+def test_keyframeThreshold():
+    case = getCase('bezier')
+    for x, y in case['co']:
+        inside = evaluateCase(case, [x - addon.keyframeThreshold / 2, x + addon.keyframeThreshold / 2])
+        assert inside.tolist() == [y, y]
+        
+    # Outside the threshold, the curve is interpolated. Not checked at the end keyframes, where the constant
+    # extrapolation also gives the keyframe value.
+    for x, y in case['co'][1:-1]:
+        outside = evaluateCase(case, [x - addon.keyframeThreshold * 2, x + addon.keyframeThreshold * 2])
+        assert not np.any(outside == y)
+        
+    recordedTimes = np.array(case['times'])
+    for x, y in case['co']:
+        near = np.abs(recordedTimes - x) < addon.keyframeThreshold
+        assert near.any()
+        np.testing.assert_array_equal(np.array(case['values'])[near], y)
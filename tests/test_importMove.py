@@ -0,0 +1,111 @@
+# Raw Move and Arc Move import
+
+import bpy
+import fakebpy
+import numpy as np
+import pytest
+
+import MoCoExportAddon as addon
+
+
+def buildImportScene(tmp_path):
+    bpy.data.filepath = str(tmp_path / 'test.blend')
+    scene = fakebpy.buildScene(bpy, addon, 4, 20, 5)
+    scene.moco_limit_check = '0'
+    return scene
+
+
+# Remove the keyframes of every axis, so the import goes into empty axes
+def clearAxisKeyframes(scene):
+    scene.animation_data.action = None
+    addon.invalidateFCurveIndex()
+    for axisIndex in range(len(scene.moco_axes)):
+        assert addon.getAxisFCurve(axisIndex) is None
+
+
+# A Raw Move export imports back as a linear keyframe on every row with the exported positions
+def test_rawMoveRoundTrip(tmp_path):
+    scene = buildImportScene(tmp_path)
+    positions = addon.sampleRawMovePositions(scene)
+    filepath = addon.exportSceneMovement(scene, ['0'])[0][0]
+    
+    clearAxisKeyframes(scene)
+    imported, skipped = addon.importRawMove(scene, filepath, False, True)
+    assert imported == ["Axis 0", "Axis 1", "Axis 2", "Axis 3"]
+    assert skipped == 0
+    assert scene.frame_end == 20
+    
+    for axisIndex in range(4):
+        co, handleLeft, handleRight, interpolation, linearExtrapolation = addon.getKeyframeArrays(addon.getAxisFCurve(axisIndex))
+        assert np.array_equal(co[:, 0], np.arange(1, 21))
+        assert np.all(interpolation == addon.interpolationLinear)
+        assert np.allclose(co[:, 1], positions[axisIndex], atol = 1e-6)
+
+
+# An Arc Move export imports back with the same keyframes and handles
+def test_arcMoveRoundTrip(tmp_path):
+    scene = buildImportScene(tmp_path)
+    originals = [addon.getKeyframeArrays(addon.getAxisFCurve(axisIndex)) for axisIndex in range(4)]
+    filepath = addon.exportSceneMovement(scene, ['1'])[0][0]
+    
+    clearAxisKeyframes(scene)
+    scene.frame_end = 5
+    imported, skipped = addon.importArcMove(scene, filepath, True, True)
+    assert imported == ["Axis 0", "Axis 1", "Axis 2", "Axis 3"]
+    assert skipped == 0
+    assert scene.frame_end == 20
+    
+    for axisIndex, original in enumerate(originals):
+        co, handleLeft, handleRight, interpolation, linearExtrapolation = addon.getKeyframeArrays(addon.getAxisFCurve(axisIndex))
+        assert np.allclose(co, original[0], atol = 1e-6)
+        assert np.allclose(handleRight[:-1], original[2][:-1], atol = 1e-6)
+        assert np.allclose(handleLeft[1:], original[1][1:], atol = 1e-6)
+        assert np.all(interpolation == addon.interpolationBezier)
+
+
+# Columns are matched to axes by the labels in the first row, and columns without an axis are skipped
+def test_rawMoveByLabel(tmp_path):
+    scene = buildImportScene(tmp_path)
+    filepath = tmp_path / 'labels.txt'
+    filepath.write_text("Axis_1 Unknown Axis_0\n1 2 3\n\n4 5 6\n")
+    scene.moco_axes[0].label = "Axis_0"
+    scene.moco_axes[1].label = "Axis_1"
+    addon.invalidateAxisTable()
+    clearAxisKeyframes(scene)
+    
+    imported, skipped = addon.importRawMove(scene, str(filepath), True, False)
+    assert imported == ["Axis_1", "Axis_0"]
+    assert skipped == 1
+    assert np.array_equal(addon.getKeyframeArrays(addon.getAxisFCurve(0))[0][:, 1], [3, 6])
+    assert np.array_equal(addon.getKeyframeArrays(addon.getAxisFCurve(1))[0][:, 1], [1, 4])
+
+
+# Short rows and values that aren't numbers are errors
+@pytest.mark.parametrize('text', ["1 2 3\n4 5\n", "1 2 3\n4 five 6\n", "Axis_0 Axis_1\n1 2\n3\n"])
+def test_malformedRawMove(tmp_path, text):
+    scene = buildImportScene(tmp_path)
+    filepath = tmp_path / 'malformed.txt'
+    filepath.write_text(text)
+    
+    with pytest.raises(ValueError):
+        addon.importRawMove(scene, str(filepath), False, True)
+
+
+# Arc Move axes with missing control points are errors
+def test_malformedArcMove(tmp_path):
+    scene = buildImportScene(tmp_path)
+    filepath = tmp_path / 'malformed.arcm'
+    filepath.write_text('<scen:scene xmlns:scen="http://caliri.com/motion/scene" endframe="10"><scen:axis name="Axis 0"><scen:points y="0" x="1" /><scen:points y="1" x="11" /><scen:controlPoints y="0" x="4" /></scen:axis></scen:scene>')
+    
+    with pytest.raises(ValueError):
+        addon.importArcMove(scene, str(filepath), False, True)
+
+
+# Nothing is imported from an empty file
+def test_emptyRawMove(tmp_path):
+    scene = buildImportScene(tmp_path)
+    filepath = tmp_path / 'empty.txt'
+    filepath.write_text("\n\n")
+    
+    assert addon.importRawMove(scene, str(filepath), False, True) == ([], 0)
+    assert scene.frame_end == 20
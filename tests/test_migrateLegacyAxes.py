@@ -0,0 +1,51 @@
+# Migration of files saved before axes were stored in moco_axes
+
+import bpy
+import fakebpy
+
+import MoCoExportAddon as addon
+
+
+# A scene as saved by the old addon: two axes, and a curve left past the end by an axis that was removed
+def buildLegacyScene():
+    scene = fakebpy.buildScene(bpy, addon, 0, 100, 0)
+    scene['moco_num_axis'] = 2
+    for index, (label, component) in enumerate([("Slider", 0), ("Pan", 3)]):
+        scene['moco_axis_label_' + str(index)] = label
+        scene['moco_axis_component_' + str(index)] = component
+        scene['moco_axis_object_' + str(index)] = ""
+        scene['moco_axis_setlength_' + str(index)] = 0.0
+        scene['moco_axis_setrot_' + str(index)] = 0.0
+        
+    fcurves = scene.animation_data.action.fcurves
+    for dataPath in ['moco_axis_setlength_0', 'moco_axis_setrot_1', 'moco_axis_setlength_3']:
+        fcurves.new(dataPath).keyframe_points.insert(1, 1.0)
+    return scene
+
+
+def test_migratesAxesAndCurves():
+    scene = buildLegacyScene()
+    assert addon.migrateLegacyAxes(scene)
+    
+    assert [axis.label for axis in scene.moco_axes] == ["Slider", "Pan"]
+    assert [axis.component for axis in scene.moco_axes] == ['0', '3']
+    assert 'moco_num_axis' not in scene.keys()
+    
+    dataPaths = [fcurve.data_path for fcurve in scene.animation_data.action.fcurves]
+    assert dataPaths == ['moco_axes[0].setlength', 'moco_axes[1].setrot']
+    
+    
+# Axes added after migration start without the animation of the removed axis
+def test_removesCurvesOfRemovedAxes():
+    scene = buildLegacyScene()
+    addon.migrateLegacyAxes(scene)
+    addon.props = scene
+    addon.invalidateFCurveIndex()
+    
+    for index in range(2):
+        addon.AddAxis().execute(bpy.context)
+    scene.moco_axes[3].component = '0'
+    addon.invalidateAxisTable()
+    
+    assert addon.getAxisFCurve(3) is None
+    assert not any(fcurve.data_path.startswith('moco_axis_') for fcurve in scene.animation_data.action.fcurves)
@@ -0,0 +1,91 @@
+# Sample cache
+
+import os
+
+import bpy
+import fakebpy
+import numpy as np
+
+import MoCoExportAddon as addon
+
+
+def buildCacheScene(tmp_path, numAxes, numFrames, cache):
+    bpy.data.filepath = str(tmp_path / 'test.blend')
+    bpy.data.is_saved = True
+    scene = fakebpy.buildScene(bpy, addon, numAxes, numFrames, 5)
+    scene.moco_sample_cache = cache
+    addon.clearSampleCache()
+    return scene
+
+
+# Records the number of evaluateKeyframes calls
+def countEvaluations(monkeypatch):
+    calls = []
+    evaluateKeyframes = addon.evaluateKeyframes
+    
+    def countCall(*args):
+        calls.append(args)
+        return evaluateKeyframes(*args)
+    monkeypatch.setattr(addon, 'evaluateKeyframes', countCall)
+    return calls
+
+
+# Only the axis whose keyframes changed is evaluated again
+def test_recomputesChangedAxis(tmp_path, monkeypatch):
+    scene = buildCacheScene(tmp_path, 3, 100, '1')
+    calls = countEvaluations(monkeypatch)
+    
+    first = addon.sampleAxisPositions(scene)
+    assert len(calls) == 3
+    assert np.array_equal(addon.sampleAxisPositions(scene), first)
+    assert len(calls) == 3
+    
+    addon.getAxisFCurve(1).keyframe_points.co[2, 1] += 0.5
+    second = addon.sampleAxisPositions(scene)
+    assert len(calls) == 4
+    assert np.array_equal(second[[0, 2]], first[[0, 2]])
+    assert not np.array_equal(second[1], first[1])
+    
+    scene.moco_sample_cache = '0'
+    assert np.array_equal(addon.sampleAxisPositions(scene), second)
+
+
+# Over the size limit, the least recently used axes are evicted from memory and from the cache folder
+def test_evictsLeastRecentlyUsed(tmp_path):
+    # 50000 samples of 8 bytes are about 0.4 MB per axis, so a 1 MB cache holds two axes
+    scene = buildCacheScene(tmp_path, 4, 50000, '2')
+    scene.moco_sample_cache_size = 1
+    
+    addon.sampleAxisPositions(scene)
+    assert len(addon.sampleCache) == 2
+    assert addon.sampleCacheBytes <= 1024 * 1024
+    folder = addon.getSampleCacheFolder()
+    assert len([name for name in os.listdir(folder) if name.endswith('.npy')]) == 2
+    
+    # The last two axes are kept. Looking one up makes it the most recently used, so the other is evicted next.
+    frames = addon.getSampleTimes(scene)
+    keys = [addon.getSampleCacheKey(scene, entry, addon.getKeyframeArrays(addon.getAxisFCurve(entry.index)), frames) for entry in addon.getAxisTable()]
+    assert list(addon.sampleCache) == keys[2:]
+    assert sorted(os.listdir(folder)) == sorted(key + '.npy' for key in keys[2:])
+    assert not (addon.getCachedSamples(scene, keys[2]) is None)
+    addon.addCachedSamples(scene, 'extra', np.zeros(50000))
+    assert list(addon.sampleCache) == [keys[2], 'extra']
+
+
+# Axes stored on disk are loaded back, memory mapped, with the same samples in a new session
+def test_reloadsFromDisk(tmp_path, monkeypatch):
+    scene = buildCacheScene(tmp_path, 3, 100, '2')
+    first = addon.sampleAxisPositions(scene)
+    assert len([name for name in os.listdir(addon.getSampleCacheFolder()) if name.endswith('.npy')]) == 3
+    
+    addon.sampleCache.clear()
+    addon.sampleCacheBytes = 0
+    calls = countEvaluations(monkeypatch)
+    
+    assert np.array_equal(addon.sampleAxisPositions(scene), first)
+    assert len(calls) == 0
+    assert all(isinstance(samples, np.memmap) for samples in addon.sampleCache.values())
+    
+    assert addon.clearSampleCache() == 3
+    assert addon.sampleAxisPositions(scene).shape == first.shape
+    assert len(calls) == 3
@@ -0,0 +1,82 @@
+# Live axis stream, received over localhost by MoCoStreamReceiver
+
+import time
+import socket
+import threading
+
+import bpy
+import fakebpy
+import numpy as np
+import pytest
+
+import MoCoExportAddon as addon
+import MoCoStreamReceiver
+
+
+def getFreePort(kind):
+    with socket.socket(socket.AF_INET, kind) as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+# Frames streamed from a scene with location and rotation axes arrive with the positions the axes have on those
+# frames, in exported units
+@pytest.mark.parametrize('protocol, kind', [('0', socket.SOCK_DGRAM), ('1', socket.SOCK_STREAM)])
+def test_streamsAxisPositions(protocol, kind):
+    scene = fakebpy.buildScene(bpy, addon, 4, 20, 5)
+    frames = [1, 2, 5, 12]
+    expected = addon.sampleAxisPositions(scene, np.array(frames, dtype = np.float64))
+    expected[3] = np.degrees(expected[3])
+    
+    port = getFreePort(kind)
+    records = {}
+    
+    def receive():
+        for packet, arrival in MoCoStreamReceiver.receivePackets('udp' if protocol == '0' else 'tcp', '127.0.0.1', port, time.time() + 10, len(frames)):
+            sequence, frame, sentTime, positions = MoCoStreamReceiver.parsePacket(packet)
+            records[frame] = positions
+    receiver = threading.Thread(target = receive, daemon = True)
+    receiver.start()
+    
+    scene.moco_stream_protocol = protocol
+    scene.moco_stream_port = port
+    scene.moco_stream_enabled = True
+    try:
+        # The first frame is sent again until the receiver is listening
+        for frame in frames:
+            deadline = time.time() + 5
+            while not (frame in records) and time.time() < deadline:
+                scene.frame_set(frame)
+                waitUntil = time.time() + 0.2
+                while not (frame in records) and time.time() < waitUntil:
+                    time.sleep(0.005)
+            assert frame in records
+    finally:
+        scene.moco_stream_enabled = False
+    receiver.join(timeout = 5)
+    
+    for index, frame in enumerate(frames):
+        assert np.allclose(records[frame], expected[:, index], atol = 1e-5)
+
+
+# Stopping a stream doesn't wait for the sender thread, which exits on its own
+def test_stopDoesNotWaitForSender():
+    stream = addon.AxisStream('1', '127.0.0.1', getFreePort(socket.SOCK_STREAM))
+    stream.send(1.0, [0.0])
+    time.sleep(0.1)
+    
+    start = time.time()
+    stream.stop()
+    assert time.time() - start < 0.05
+    stream.thread.join(timeout = 2)
+    assert not stream.thread.is_alive()
+
+
+# Opening a file turns streaming off
+def test_loadTurnsStreamingOff():
+    scene = fakebpy.buildScene(bpy, addon, 1, 10, 2)
+    scene.moco_stream_enabled = True
+    for handler in bpy.app.handlers.load_post:
+        handler(None)
+    assert not scene.moco_stream_enabled
+    assert addon.axisStream is None
@@ -0,0 +1,123 @@
+# Arc Move export
+
+import bpy
+import fakebpy
+import numpy as np
+from xml.etree import ElementTree
+
+import MoCoExportAddon as addon
+
+
+# A scene with one Axis Input axis and one World axis reading an object that moves along X
+def buildWorldAxisScene(tmp_path):
+    bpy.data.filepath = str(tmp_path / 'test.blend')
+    bpy.data.is_saved = True
+    scene = fakebpy.buildScene(bpy, addon, 1, 24, 4)
+    scene.moco_export_type = '1'
+    scene.moco_limit_check = '1'
+    
+    dolly = fakebpy.Object("Dolly")
+    
+    def getMatrix(frame):
+        matrix = np.identity(4)
+        matrix[0, 3] = frame * 0.1
+        return matrix
+    dolly.animateMatrix = getMatrix
+    scene.objects.append(dolly)
+    
+    axis = scene.moco_axes.add()
+    axis._values.update(label = "Dolly", component = '0', object = dolly.name, space = '1')
+    addon.invalidateAxisTable()
+    return scene
+
+
+# The World axis is sampled by setting every frame, which is done once and shared with the limit check
+def test_samplesTransformAxesOnce(tmp_path, monkeypatch):
+    scene = buildWorldAxisScene(tmp_path)
+    passes = []
+    sampleWorldMatrices = addon.sampleWorldMatrices
+    
+    def countPasses(*args, **kwargs):
+        passes.append(len(args[2]))
+        return sampleWorldMatrices(*args, **kwargs)
+    monkeypatch.setattr(addon, 'sampleWorldMatrices', countPasses)
+    
+    operator = addon.ExportMovement()
+    operator.report = lambda level, message: None
+    assert operator.execute(bpy.context) == {'FINISHED'}
+    assert passes == [24]
+    
+    passes.clear()
+    addon.exportSceneMovement(scene, ['0', '1'])
+    assert passes == [24]
+
+
+# Reduce Keyframes leaves hand keyed axes as they are, even when they are dense enough to be refitted
+def test_reduceKeepsHandKeyedAxes(tmp_path):
+    bpy.data.filepath = str(tmp_path / 'test.blend')
+    scene = fakebpy.buildScene(bpy, addon, 2, 40, 10)
+    scene.moco_export_type = '1'
+    scene.moco_arc_reduce = True
+    
+    frames = addon.getArcMoveFrames(scene)
+    positions = addon.sampleAxisPositions(scene, frames)
+    for axisIndex in range(2):
+        keyframes, deviation = addon.getArcMoveAxisKeyframes(scene, axisIndex, frames, positions)
+        original = addon.getKeyframeArrays(addon.getAxisFCurve(axisIndex))[:3]
+        assert len(keyframes[0]) == 10
+        for array, originalArray in zip(keyframes, original):
+            assert np.array_equal(array, originalArray)
+        assert deviation == 0.0
+    
+    filepath, deviations = addon.writeArcMove(scene, positions)
+    assert deviations == [0.0, 0.0]
+
+
+# A baked axis with a keyframe on every frame is refitted with fewer keyframes within the tolerance
+def test_reduceBakedAxis(tmp_path):
+    bpy.data.filepath = str(tmp_path / 'test.blend')
+    scene = fakebpy.buildScene(bpy, addon, 1, 200, 200)
+    scene.moco_arc_reduce = True
+    points = addon.getAxisFCurve(0).keyframe_points
+    points.co[:, 1] = np.sin(points.co[:, 0] / 20)
+    points.handleLeft[:, 1] = points.co[:, 1]
+    points.handleRight[:, 1] = points.co[:, 1]
+    addon.invalidateAxisTable()
+    
+    frames = addon.getArcMoveFrames(scene)
+    positions = addon.sampleAxisPositions(scene, frames)
+    keyframes, deviation = addon.getArcMoveAxisKeyframes(scene, 0, frames, positions)
+    assert len(keyframes[0]) < 40
+    assert deviation <= scene.moco_arc_tolerance_length
+    
+    interpolation = np.full(len(keyframes[0]), addon.interpolationBezier)
+    fitted = addon.evaluateKeyframes(*keyframes, interpolation, False, frames)
+    assert np.max(np.abs(fitted - positions[0])) <= scene.moco_arc_tolerance_length
+
+
+# Axis names with markup characters, quotes, whitespace and non-ASCII text are escaped, parse back with ElementTree
+# and import back into the axes with the same labels
+def test_escapesAxisNames(tmp_path):
+    bpy.data.filepath = str(tmp_path / 'test.blend')
+    scene = fakebpy.buildScene(bpy, addon, 4, 24, 4)
+    labels = ['Pan & Tilt <main>', 'Say "cheese" & \'smile\'', 'Fokus ä → ∞', 'Tab\tand\nnewline']
+    for axis, label in zip(scene.moco_axes, labels):
+        axis.label = label
+    addon.invalidateAxisTable()
+    
+    filepath = addon.writeArcMove(scene)[0]
+    with open(filepath, 'rb') as file:
+        text = file.read().decode('utf-8')
+    assert '&amp;' in text and '&lt;' in text and '&quot;' in text and 'Fokus ä → ∞' in text
+    
+    root = ElementTree.parse(filepath).getroot()
+    assert root.tag == addon.arcMoveNamespace + 'scene'
+    assert [axis.get('name') for axis in root.iter(addon.arcMoveNamespace + 'axis')] == labels
+    
+    originals = [addon.getKeyframeArrays(addon.getAxisFCurve(axisIndex))[0] for axisIndex in range(4)]
+    scene.animation_data.action = None
+    addon.invalidateFCurveIndex()
+    imported, skipped = addon.importArcMove(scene, filepath, True, False)
+    assert imported == labels
+    for axisIndex, original in enumerate(originals):
+        assert np.allclose(addon.getKeyframeArrays(addon.getAxisFCurve(axisIndex))[0], original, atol = 1e-6)
@@ -0,0 +1,72 @@
+# Raw Move export
+
+import bpy
+import fakebpy
+import numpy as np
+import pytest
+
+import MoCoExportAddon as addon
+
+
+def buildExportScene(tmp_path, numAxes):
+    bpy.data.filepath = str(tmp_path / 'test.blend')
+    scene = fakebpy.buildScene(bpy, addon, numAxes, 10, 2)
+    scene.moco_limit_check = '0'
+    return scene
+
+
+def test_exportsSceneWithoutAxes(tmp_path):
+    scene = buildExportScene(tmp_path, 0)
+    filepaths, violations = addon.exportSceneMovement(scene, ['0'])
+    
+    with open(filepaths[0], 'r', newline = '') as file:
+        assert file.read() == "\n" * 10
+        
+        
+# Fixed point columns, rounded instead of cut, without exponents or negative zeros
+def test_formatsFixedPointColumns(tmp_path):
+    scene = buildExportScene(tmp_path, 2)
+    scene.moco_axes[1].component = '3'
+    scene.moco_raw_precision_rotation = 2
+    addon.invalidateAxisTable()
+    
+    positions = np.array([[0.00001234, -0.000000001, -12345.1234567], [np.radians(90), -0.00001, np.radians(-0.125)]])
+    with open(addon.writeRawMove(positions), 'r', newline = '') as file:
+        rows = file.read().split("\n")
+        
+    assert rows[0] == "0.000012        90.00           "
+    assert rows[1] == "0.000000        0.00            "
+    assert rows[2] == "-12345.123457    -0.12           "
+
+
+# Half way values are rounded once, by the format
+def test_roundsHalfWayValuesOnce(tmp_path):
+    scene = buildExportScene(tmp_path, 1)
+    
+    positions = np.array([[82.5511155, -0.0000005, -0.0000006]])
+    with open(addon.writeRawMove(positions), 'r', newline = '') as file:
+        rows = file.read().split("\n")
+        
+    assert rows[0] == "82.551115       "
+    assert rows[1] == "0.000000        "
+    assert rows[2] == "-0.000001       "
+
+
+# An export that fails still clears the export and profiling state
+def test_failedExportClearsState(tmp_path, monkeypatch):
+    scene = buildExportScene(tmp_path, 1)
+    bpy.data.is_saved = True
+    scene.moco_profile = True
+    
+    def failWrite(*args):
+        assert addon.profileEnabled
+        raise OSError("Disk full")
+    monkeypatch.setattr(addon, 'writeRawMove', failWrite)
+    
+    operator = addon.ExportMovement()
+    operator.report = lambda level, message: None
+    for export in [lambda: operator.execute(bpy.context), lambda: addon.exportSceneMovement(scene, ['0'])]:
+        with pytest.raises(OSError):
+            export()
+        assert not addon.exportingCameraMovement
+        assert not addon.profileEnabled